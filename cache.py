@@ -0,0 +1,222 @@
+"""
+Дисковый кеш результатов анализа иерархии (матрицы task1 и энтропия task2).
+
+Ключ — sha256 от канонического представления снимка: множества рёбер (без учёта
+порядка строк и направления записи пары), корня и версии алгоритма. Каждая запись —
+отдельный файл, который читается через mmap:
+  - матрицы R1..R5 — файл relation_format (кодировка PACKED);
+  - энтропия — заголовок <4s B I d d>: магия, вид записи, N, entropy_sum, h.
+
+Записи пишутся во временный файл и атомарно переименовываются, поэтому читатели
+из других процессов никогда не видят недописанный файл. Время последнего доступа
+хранится в mtime; при превышении лимита размера под файловой блокировкой удаляются
+самые старые записи (LRU).
+"""
+from typing import Callable, List, Optional, Tuple
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+from loader import load_task
+import relation_format
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Увеличивать при любом изменении алгоритмов, влияющем на результат
+ALGORITHM_VERSION = 1
+
+DEFAULT_DIRECTORY = os.environ.get(
+    'SYSTEM_ANALYSIS_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'system-analysis')
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+MAGIC = b'SAC1'
+HEADER = struct.Struct('<4sBIdd')
+RELATIONS = 1
+ENTROPY = 2
+SUFFIX = '.bin'
+
+Matrix = List[List[bool]]
+
+
+def snapshot_key(s: str, e: str) -> str:
+    """
+    Канонический хеш снимка оргструктуры: (множество рёбер, корень, версия алгоритма).
+    """
+    edges = sorted({tuple(sorted(pair.split(','))) for pair in s.split('\n')})
+    canonical = json.dumps([ALGORITHM_VERSION, e, edges], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Кеш в каталоге directory с ограничением суммарного размера max_bytes.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, kind: int) -> str:
+        return os.path.join(self.directory, f'{key}.{kind}{SUFFIX}')
+
+    def get_relations(self, key: str) -> Optional[List[relation_format.relation_view]]:
+        """
+        Возвращает матрицы записи key (представления поверх mmap) или None, если её нет.
+        """
+        path = self._path(key, RELATIONS)
+        try:
+            views = relation_format.load(path)
+            os.utime(path)  # отметка доступа для LRU
+        except (FileNotFoundError, ValueError, struct.error):
+            return None
+        return views
+
+    def put_relations(self, key: str, matrices: Tuple[Matrix, ...]):
+        """
+        Атомарно записывает матрицы и, при необходимости, вытесняет старые записи.
+        """
+        self._write(key, RELATIONS, lambda path: relation_format.dump(
+            path, matrices, [relation_format.PACKED] * len(matrices)
+        ))
+
+    def get(self, key: str, kind: int) -> Optional[Tuple[int, float, float, memoryview]]:
+        """
+        Возвращает (N, entropy_sum, h, тело записи) или None, если записи нет.
+        Тело — memoryview поверх mmap, копирования данных не происходит.
+        """
+        path = self._path(key, kind)
+        try:
+            with open(path, 'rb') as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)  # отметка доступа для LRU
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if len(mapped) < HEADER.size:
+            return None
+        magic, stored_kind, N, entropy_sum, h = HEADER.unpack_from(mapped)
+        if magic != MAGIC or stored_kind != kind:
+            return None
+        return N, entropy_sum, h, memoryview(mapped)[HEADER.size:]
+
+    def put(self, key: str, kind: int, N: int, entropy_sum: float, h: float, body: bytes):
+        """
+        Атомарно записывает запись и, при необходимости, вытесняет старые.
+        """
+        def write(path: str):
+            with open(path, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, kind, N, entropy_sum, h))
+                file.write(body)
+
+        self._write(key, kind, write)
+
+    def _write(self, key: str, kind: int, write: Callable[[str], None]):
+        # пишем во временный файл и переименовываем: читатели не видят недописанную запись
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            write(temp_path)
+            os.replace(temp_path, self._path(key, kind))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Удаляет наименее недавно использованные записи, пока размер кеша больше max_bytes.
+        """
+        with open(os.path.join(self.directory, '.lock'), 'a+b') as lock:
+            _lock(lock)
+            try:
+                entries = []
+                for name in os.listdir(self.directory):
+                    if not name.endswith(SUFFIX):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, name))
+
+                total = sum(size for _, size, _ in entries)
+                for _, size, name in sorted(entries):
+                    if total <= self.max_bytes:
+                        break
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+            finally:
+                _unlock(lock)
+
+
+def _lock(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+_default_cache: Optional[AnalysisCache] = None
+
+
+def _get_default_cache() -> AnalysisCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AnalysisCache()
+    return _default_cache
+
+
+def relations(s: str, e: str, cache: AnalysisCache = None) -> Tuple[Matrix, Matrix, Matrix, Matrix, Matrix]:
+    """
+    То же, что task1.main(s, e), но с повторным использованием результата из кеша.
+    """
+    cache = cache or _get_default_cache()
+    task1 = load_task('task1')
+    key = snapshot_key(s, e)
+
+    views = cache.get_relations(key)
+    if views is not None:
+        return tuple(view.to_lists() for view in views)
+
+    result = task1.main(s, e)
+    cache.put_relations(key, result)
+    return result
+
+
+def entropy(s: str, e: str, cache: AnalysisCache = None) -> Tuple[float, float]:
+    """
+    То же, что task2.main(s, e), но с повторным использованием результата из кеша.
+    """
+    cache = cache or _get_default_cache()
+    key = snapshot_key(s, e)
+
+    entry = cache.get(key, ENTROPY)
+    if entry is not None:
+        _, entropy_sum, h, _ = entry
+        return entropy_sum, h
+
+    entropy_sum, h = load_task('task2').main(s, e)
+    cache.put(key, ENTROPY, 0, entropy_sum, h, b'')
+    return entropy_sum, h
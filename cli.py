@@ -0,0 +1,144 @@
+"""
+Единая точка входа для пакетных заданий task1 / task2 / task4.
+
+Процесс запускается один раз и выполняет много заданий: модули задач загружаются
+лениво при первом обращении и дальше переиспользуются (вместе с их кешами, например
+разобранными описаниями контроллера task4).
+
+Задания читаются построчно из stdin в формате JSON:
+  {"id": 1, "task": "task2", "args": ["1,2\\n1,3\\n3,4", "1"]}
+  {"id": 2, "task": "task4", "args": [19]}
+  {"id": 3, "task": "task2", "function": "entropy_breakdown", "args": ["1,2\\n1,3", "1"]}
+Для task4 с единственным аргументом используются описания T_FUNC, TERM_FUNC, DIRECT_MAP.
+Вызывать можно только функции из FUNCTIONS (по умолчанию main).
+На каждое задание в stdout печатается строка JSON с result (или error) и временем;
+ошибка задания, в том числе несериализуемый результат, не останавливает процесс.
+
+Примеры:
+  python cli.py < jobs.jsonl
+  python cli.py --warm task1,task2 --timing < jobs.jsonl
+  python cli.py --measure-startup
+"""
+from typing import Dict, List
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from loader import ROOT, load_task
+
+TASKS = ('task1', 'task2', 'task4')
+
+# функции, доступные заданиям: принимают и возвращают значения, представимые в JSON
+FUNCTIONS = {
+    'task1': ('main',),
+    'task2': ('main', 'entropy_breakdown', 'approximate_entropy'),
+    'task4': ('main', 'infer'),
+}
+
+
+def run_job(job: dict) -> dict:
+    """
+    Выполняет одно задание и возвращает ответ для печати.
+    """
+    started = time.perf_counter()
+    response = {'id': job.get('id')}
+    try:
+        task = job['task']
+        if task not in TASKS:
+            raise ValueError(f'неизвестная задача {task}')
+        function_name = job.get('function', 'main')
+        if function_name not in FUNCTIONS[task]:
+            raise ValueError(f'недоступная функция {function_name}, доступны: {", ".join(FUNCTIONS[task])}')
+        module = load_task(task)
+        function = getattr(module, function_name)
+
+        args = list(job.get('args', []))
+        if task == 'task4' and function_name == 'main' and len(args) == 1:
+            args = [module.T_FUNC, module.TERM_FUNC, module.DIRECT_MAP] + args
+
+        response['result'] = function(*args)
+    except Exception as error:
+        response['error'] = f'{type(error).__name__}: {error}'
+    response['seconds'] = time.perf_counter() - started
+    return response
+
+
+def encode(response: dict) -> str:
+    """
+    Строка JSON для ответа; несериализуемый результат заменяется ошибкой.
+    """
+    try:
+        return json.dumps(response, ensure_ascii=False)
+    except (TypeError, ValueError) as error:
+        return json.dumps({
+            'id': response.get('id'),
+            'error': f'результат не сериализуется в JSON: {type(error).__name__}: {error}',
+            'seconds': response.get('seconds', 0.0)
+        }, ensure_ascii=False)
+
+
+def measure_cold_start(task: str = None, runs: int = 5) -> float:
+    """
+    Медиана времени (в секундах) запуска нового интерпретатора с импортом модуля задачи
+    (без task — только интерпретатор и loader, для сравнения).
+    """
+    code = f'import sys; sys.path.insert(0, {ROOT!r}); import loader'
+    if task is not None:
+        code += f'; loader.load_task({task!r})'
+    timings: List[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def serve(jobs, output, warm: List[str] = (), timing: bool = False):
+    """
+    Выполняет задания из итератора строк jobs, печатая ответы в output.
+    """
+    load_times: Dict[str, float] = {}
+    for task in warm:
+        started = time.perf_counter()
+        load_task(task)
+        load_times[task] = time.perf_counter() - started
+    if timing:
+        for task, seconds in load_times.items():
+            print(f'{task}: загрузка {seconds * 1000:.1f} мс', file=sys.stderr)
+
+    for line in jobs:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError('ожидается объект JSON')
+        except ValueError as error:
+            response = {'id': None, 'error': f'некорректное задание: {error}', 'seconds': 0.0}
+        else:
+            response = run_job(job)
+        if timing:
+            print(f'задание {response.get("id")}: {response["seconds"] * 1000:.1f} мс', file=sys.stderr)
+        output.write(encode(response) + '\n')
+        output.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Пакетное выполнение заданий task1/task2/task4 в одном процессе')
+    parser.add_argument('--warm', default='', help='задачи для предварительной загрузки, через запятую')
+    parser.add_argument('--timing', action='store_true', help='печатать время загрузки и заданий в stderr')
+    parser.add_argument('--measure-startup', action='store_true',
+                        help='измерить время холодного старта для каждой задачи и выйти')
+    args = parser.parse_args()
+
+    if args.measure_startup:
+        baseline = measure_cold_start()
+        print(f'интерпретатор: {baseline * 1000:.1f} мс')
+        for task in TASKS:
+            seconds = measure_cold_start(task)
+            print(f'{task}: {seconds * 1000:.1f} мс (импорт {(seconds - baseline) * 1000:.1f} мс)')
+    else:
+        serve(sys.stdin, sys.stdout, [task for task in args.warm.split(',') if task], args.timing)
@@ -0,0 +1,590 @@
+"""
+Дифференциальная проверка быстрых реализаций против эталонного кода на чистом Python.
+
+Для каждого свойства генерируются случайные входы (деревья со случайными идентификаторами,
+порядком и направлением записи рёбер и корнем; случайные булевы матрицы; случайные
+описания нечеткого контроллера), результат каждой доступной реализации сравнивается
+с эталоном побитово (по repr, т.е. с учётом типов значений), а найденное расхождение
+жадно сокращается до минимального контрпримера. Заодно замеряется пропускная
+способность каждой реализации.
+
+Эталоны:
+  - bool_multiplication / transpose / bool_sum из task1;
+  - исходный алгоритм графа (словарь множеств, рекурсивное удаление родителя,
+    замыкание суммой N степеней) — reference_relations ниже;
+  - исходный подсчёт энтропии task2 по этим матрицам — reference_entropy;
+  - исходный task4.main с разбором JSON на каждый вызов — reference_infer.
+
+Пример:
+  python differential.py --cases 200 --seed 1
+  python differential.py --cases 50 --max-nodes 40 --pool
+"""
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Tuple
+import argparse
+import atexit
+import copy
+import importlib.util
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+
+from loader import load_task
+
+Matrix = List[List[bool]]
+
+
+# ---------------------------------------------------------------- эталоны
+
+def reference_relations(s: str, e: str) -> Tuple[Matrix, Matrix, Matrix, Matrix, Matrix]:
+    """
+    Матрицы R1..R5 исходным алгоритмом task1.
+    """
+    task1 = load_task('task1')
+    nodes = defaultdict(set)
+    for pair in s.split('\n'):
+        edge = pair.split(',')
+        nodes[edge[0]].add(edge[1])
+        nodes[edge[1]].add(edge[0])
+
+    def remove_root(node, root):
+        if root is not None:
+            nodes[node].discard(root)
+        for child in nodes[node]:
+            remove_root(child, node)
+
+    remove_root(e, None)
+
+    key_map = {k: i for i, k in enumerate(sorted(nodes.keys()))}
+    N = len(key_map)
+    r1 = [[False] * N for _ in range(N)]
+    for id1 in nodes:
+        for id2 in nodes[id1]:
+            r1[key_map[id1]][key_map[id2]] = True
+
+    r2 = task1.transpose(copy.deepcopy(r1))
+    r3 = copy.deepcopy(r1)
+    power = copy.deepcopy(r1)
+    for _ in range(N):
+        r3 = task1.bool_sum(r3, power)
+        power = task1.bool_multiplication(power, r1)
+    r4 = task1.transpose(copy.deepcopy(r3))
+    r5 = task1.bool_multiplication(copy.deepcopy(r2), copy.deepcopy(r1))
+    for k in range(N):
+        r5[k][k] = False
+    return r1, r2, r3, r4, r5
+
+
+def reference_entropy(s: str, e: str) -> Tuple[float, float]:
+    """
+    Энтропия исходным алгоритмом task2 по матрицам reference_relations.
+    """
+    connections = [[sum(row) for row in relation] for relation in reference_relations(s, e)]
+    for i in range(len(connections[2])):
+        connections[2][i] -= connections[0][i]
+        connections[3][i] -= connections[1][i]
+
+    max_connections = float(len(connections[0]) - 1)
+    entropy_sum = 0
+    for relations in connections:
+        for relation in relations:
+            p = float(relation) / max_connections
+            entropy_sum += 0 if p == 0 else -p * math.log(p, 2)
+    h = entropy_sum / (float(len(connections[0]) * 5) * 0.5307)
+    return (round(entropy_sum, 1), round(h, 1))
+
+
+def reference_membership(x: float, points: List[List[float]]) -> float:
+    """
+    Исходная task4.get_membership (сортирует points на месте).
+    """
+    if not points:
+        return 0.0
+    points.sort(key=lambda p: p[0])
+    if x < points[0][0] or x > points[-1][0]:
+        return 0.0
+    for i in range(len(points) - 1):
+        x1, y1 = points[i]
+        x2, y2 = points[i+1]
+        if x1 <= x <= x2:
+            if x1 == x2:
+                return max(y1, y2)
+            slope = (y2 - y1) / (x2 - x1)
+            y = y1 + slope * (x - x1)
+            return y
+    return 0.0
+
+
+def reference_trapezoid(level: float, points: List[List[float]]) -> List[List[float]]:
+    """
+    Исходная task4.get_trapezoid.
+    """
+    trapezoid_points: List[List[float]] = []
+    x0, y0 = points[0]
+    if y0 > level:
+        trapezoid_points.append([x0, level])
+    for point in points:
+        x1, y1 = point
+        if (y1 - level) * (y0 - level) < 0:
+            y = level
+            x = x1 + (y - y1) * (x0 - x1) / (y0 - y1)
+            trapezoid_points.append([x, y])
+        if y1 <= level:
+            trapezoid_points.append([x1, y1])
+        x0, y0 = x1, y1
+    if y1 > level:
+        trapezoid_points.append([x0, level])
+    return trapezoid_points
+
+
+def reference_infer(
+    temperature_mfs_json: str,
+    heating_mfs_json: str,
+    rules_json: str,
+    temperature_value: float
+) -> float:
+    """
+    Исходная task4.main: разбор JSON на каждый вызов, вывод по Мамдани, первый максимум.
+    """
+    input_mfs = json.loads(temperature_mfs_json)["температура"]
+    output_mfs = json.loads(heating_mfs_json)["температура"]
+    rules = json.loads(rules_json)
+
+    input_degrees = {}
+    for element in input_mfs:
+        term = element["id"]
+        degree = reference_membership(temperature_value, element["points"])
+        input_degrees[term] = degree
+
+    output_levels = {}
+    for input_term, output_term_raw in rules:
+        output_term = (output_term_raw[:-1] + "ый") if output_term_raw[-1] == "о" else output_term_raw
+        activation_level = input_degrees.get(input_term, 0.0)
+        current_level = output_levels.get(output_term, 0.0)
+        output_levels[output_term] = max(current_level, activation_level)
+
+    activations = defaultdict(list)
+    for element in output_mfs:
+        term_id = element["id"]
+        level = output_levels.get(term_id, 0.0)
+        activations[term_id] = reference_trapezoid(level, element["points"])
+
+    left_max = []
+    for term_id, point_list in activations.items():
+        for point in point_list:
+            if not left_max:
+                left_max = copy.deepcopy(point)
+            elif (left_max[1] < point[1]) or ((left_max[1] == point[1]) and (left_max[0] > point[0])):
+                left_max[1] = point[1]
+                left_max[0] = point[0]
+
+    return left_max[0]
+
+
+def reference_fuzzy(case) -> List[float]:
+    specs, values = case
+    return [reference_infer(*specs, value) for value in values]
+
+
+# ---------------------------------------------------------------- генераторы
+
+def random_tree(rnd: random.Random, max_nodes: int) -> Tuple[List[Tuple[str, str]], str]:
+    """
+    Дерево со случайными числовыми идентификаторами разной длины (чтобы проверить
+    строковый порядок "10" < "2"), случайным порядком и направлением рёбер и корнем.
+    """
+    n = rnd.randint(2, max_nodes)
+    ids = [str(v) for v in rnd.sample(range(1, 20 * n), n)]
+    edges = [(ids[rnd.randrange(i)], ids[i]) for i in range(1, n)]
+    edges = [(b, a) if rnd.random() < 0.5 else (a, b) for a, b in edges]
+    rnd.shuffle(edges)
+    return edges, rnd.choice(ids)
+
+
+def tree_text(case) -> Tuple[str, str]:
+    edges, root = case
+    return '\n'.join(f'{a},{b}' for a, b in edges), root
+
+
+def shrink_tree(case) -> Iterator:
+    """
+    Меньшие деревья: без одного листа (кроме корня).
+    """
+    edges, root = case
+    degree: Dict[str, int] = defaultdict(int)
+    for a, b in edges:
+        degree[a] += 1
+        degree[b] += 1
+    for k, (a, b) in enumerate(edges):
+        for leaf in (a, b):
+            if degree[leaf] == 1 and leaf != root and len(edges) > 1:
+                yield edges[:k] + edges[k + 1:], root
+                break
+
+
+def random_matrices(rnd: random.Random, max_nodes: int) -> Tuple[Matrix, Matrix]:
+    N = rnd.randint(0, max_nodes)
+    density = rnd.random()
+    return tuple([[rnd.random() < density for _ in range(N)] for _ in range(N)] for _ in range(2))
+
+
+def shrink_matrices(case) -> Iterator:
+    """
+    Меньшие пары матриц: без k-й строки и столбца, либо с одной сброшенной единицей.
+    """
+    A, B = case
+    N = len(A)
+    for k in range(N):
+        yield tuple([row[:k] + row[k + 1:] for i, row in enumerate(M) if i != k] for M in (A, B))
+    for M in range(2):
+        for i in range(N):
+            for j in range(N):
+                if case[M][i][j]:
+                    smaller = copy.deepcopy(case)
+                    smaller[M][i][j] = False
+                    yield tuple(smaller)
+
+
+def random_fuzzy(rnd: random.Random, max_nodes: int):
+    """
+    Случайные описания контроллера и медленно меняющаяся последовательность температур.
+    """
+    def membership():
+        xs = sorted(rnd.choice([rnd.randint(0, 30), round(rnd.uniform(0, 30), 2)]) for _ in range(rnd.randint(2, 5)))
+        if rnd.random() < 0.3:
+            xs[1] = xs[0]
+        if rnd.random() < 0.1:
+            xs[-1] = math.inf
+        if rnd.random() < 0.05:
+            xs[0] = -math.inf
+        return [[x, rnd.choice([0, 1, round(rnd.random(), 2)])] for x in xs]
+
+    inputs = [f'вход{k}' for k in range(rnd.randint(1, 4))]
+    outputs = ['слаб', 'умерен', 'интенсивн']
+    t_func = {"температура": [{"id": rnd.choice(inputs), "points": membership()} for _ in range(rnd.randint(1, 4))]}
+    term_func = {"температура": [{"id": term + "ый", "points": membership()} for term in outputs]}
+    rules = [[rnd.choice(inputs + ['нет']), rnd.choice(outputs) + rnd.choice(['о', 'ый'])]
+             for _ in range(rnd.randint(1, 5))]
+
+    values = []
+    x = rnd.uniform(-2, 32)
+    for _ in range(rnd.randint(1, max_nodes)):
+        x += rnd.choice([0.0, 0.01, -0.01, 0.5, -3.0, 3.0])
+        values.append(float(round(x)) if rnd.random() < 0.2 else x)
+    specs = tuple(json.dumps(spec, ensure_ascii=False) for spec in (t_func, term_func, rules))
+    return specs, values
+
+
+def shrink_fuzzy(case) -> Iterator:
+    """
+    Меньшие случаи: короче последовательность, меньше правил и термов, целые температуры.
+    """
+    specs, values = case
+    for k in range(len(values)):
+        if len(values) > 1:
+            yield specs, values[:k] + values[k + 1:]
+    for k, value in enumerate(values):
+        if value != round(value):
+            yield specs, values[:k] + [float(round(value))] + values[k + 1:]
+
+    t_func, term_func, rules = (json.loads(spec) for spec in specs)
+    for k in range(len(rules)):
+        yield (specs[0], specs[1], json.dumps(rules[:k] + rules[k + 1:], ensure_ascii=False)), values
+    for name, spec in ((0, t_func), (1, term_func)):
+        terms = spec["температура"]
+        for k in range(len(terms)):
+            if len(terms) > 1:
+                smaller = list(specs)
+                smaller[name] = json.dumps({"температура": terms[:k] + terms[k + 1:]}, ensure_ascii=False)
+                yield tuple(smaller), values
+
+
+# ---------------------------------------------------------------- реализации
+
+_pool = None
+
+
+def through_pool(function: Callable) -> Callable:
+    """
+    Вызов через общий для всех случаев multiplication_pool, даже для маленьких матриц.
+    """
+    def run(case):
+        global _pool
+        task1 = load_task('task1')
+        if _pool is None:
+            _pool = task1.multiplication_pool(processes=2)
+            atexit.register(_pool.close)
+        threshold = task1.PARALLEL_THRESHOLD
+        task1.PARALLEL_THRESHOLD = 0
+        try:
+            return function(_pool, case)
+        finally:
+            task1.PARALLEL_THRESHOLD = threshold
+    return run
+
+
+def pool_multiplication(pool, case):
+    return pool.multiply_bool(*copy.deepcopy(case))
+
+
+def pool_packed_multiplication(pool, case):
+    task1 = load_task('task1')
+    A, B = case
+    return task1.unpack_matrix(pool.multiply(task1.pack_matrix(A), task1.pack_matrix(B)), len(A))
+
+
+def pool_closure(pool, case):
+    task1 = load_task('task1')
+    R1 = reference_relations(*tree_text(case))[0]
+    return task1.unpack_matrix(pool.transitive_closure(task1.pack_matrix(R1))[0], len(R1))
+
+
+def pool_main(pool, case):
+    return load_task('task1').main(*tree_text(case), pool=pool)
+
+
+def cached(function_name: str):
+    def run(case):
+        import cache
+        with tempfile.TemporaryDirectory() as directory:
+            store = cache.AnalysisCache(directory)
+            getattr(cache, function_name)(*tree_text(case), store)
+            return getattr(cache, function_name)(*tree_text(case), store)
+    return run
+
+
+def relation_format_round_trip(case):
+    import relation_format
+    result = load_task('task1').main(*tree_text(case))
+    with tempfile.TemporaryDirectory() as directory:
+        path = directory + '/relations.bin'
+        relation_format.dump(path, result, order=relation_format.tree_order(result[0]))
+        return tuple(view.to_lists() for view in relation_format.load(path))
+
+
+def compiled_controller(case):
+    import fuzzy_compiler
+    specs, values = case
+    with tempfile.TemporaryDirectory() as directory:
+        evaluate = fuzzy_compiler.compile_controller(*specs, directory=directory).evaluate
+        return [evaluate(value) for value in values]
+
+
+def compiled_batch(case):
+    """
+    evaluate_batch вместо исключения main даёт nan; там, где на этом значении падает и
+    скалярная evaluate (её отдельно сверяет compiled), исключение возбуждается заново.
+    """
+    import fuzzy_compiler
+    specs, values = case
+    with tempfile.TemporaryDirectory() as directory:
+        module = fuzzy_compiler.compile_controller(*specs, directory=directory)
+        results = module.evaluate_batch(values).tolist()
+    for value, result in zip(values, results):
+        if math.isnan(result):
+            module.evaluate(value)
+    return results
+
+
+def tiled_transpose(case):
+    import tiled
+    A = case[0]
+    with tempfile.TemporaryDirectory() as directory:
+        with tiled.tiled_matrix(directory + '/a.bin', len(A)) as source, \
+                tiled.tiled_matrix(directory + '/t.bin', len(A)) as target:
+            source.write_rows(0, load_task('task1').pack_matrix(A))
+            tiled.tiled_transpose(source, target, tile_budget=256)
+        return relation_format_load(directory + '/t.bin')[0]
+
+
+def tiled_relations(case):
+    import tiled
+    with tempfile.TemporaryDirectory() as directory:
+        paths = tiled.relations(*tree_text(case), directory, tile_budget=256)
+        return tuple(relation_format_load(path)[0] for path in paths)
+
+
+def relation_format_load(path: str) -> List[Matrix]:
+    import relation_format
+    return [view.to_lists() for view in relation_format.load(path)]
+
+
+def fuzzy_controller(case):
+    task4 = load_task('task4')
+    specs, values = case
+    controller = task4.fuzzy_controller(*task4.parse_specs(*specs))
+    return [controller(value) for value in values]
+
+
+def properties(pool: bool) -> List[dict]:
+    task1 = load_task('task1')
+    task2 = load_task('task2')
+    task4 = load_task('task4')
+    multiplication_backends = {
+        'packed': lambda case: task1.parallel_bool_multiplication(*copy.deepcopy(case), processes=1),
+    }
+    closure_backends = {
+        'squaring': lambda case: task1.transitive_closure(reference_relations(*tree_text(case))[0])[0],
+    }
+    relation_backends = {
+        'graph': lambda case: task1.main(*tree_text(case)),
+        'cache': cached('relations'),
+        'relation_format': relation_format_round_trip,
+        'tiled': tiled_relations,
+    }
+    if pool:
+        multiplication_backends['pool'] = through_pool(pool_multiplication)
+        multiplication_backends['pool_packed'] = through_pool(pool_packed_multiplication)
+        closure_backends['pool'] = through_pool(pool_closure)
+        relation_backends['graph_pool'] = through_pool(pool_main)
+
+    checks = [
+        {
+            'name': 'bool_multiplication',
+            'generate': random_matrices,
+            'shrink': shrink_matrices,
+            'reference': lambda case: task1.bool_multiplication(*copy.deepcopy(case)),
+            'backends': multiplication_backends,
+        },
+        {
+            'name': 'transpose',
+            'generate': random_matrices,
+            'shrink': shrink_matrices,
+            'reference': lambda case: task1.transpose(copy.deepcopy(case[0])),
+            'backends': {
+                'tiled': tiled_transpose,
+            },
+        },
+        {
+            'name': 'transitive_closure',
+            'generate': random_tree,
+            'shrink': shrink_tree,
+            'reference': lambda case: reference_relations(*tree_text(case))[2],
+            'backends': closure_backends,
+        },
+        {
+            'name': 'task1.main',
+            'generate': random_tree,
+            'shrink': shrink_tree,
+            'reference': lambda case: reference_relations(*tree_text(case)),
+            'backends': relation_backends,
+        },
+        {
+            'name': 'task2.main',
+            'generate': random_tree,
+            'shrink': shrink_tree,
+            'reference': lambda case: reference_entropy(*tree_text(case)),
+            'backends': {
+                'main': lambda case: task2.main(*tree_text(case)),
+                'breakdown': lambda case: task2.entropy_breakdown(*tree_text(case))[:2],
+                'cache': cached('entropy'),
+            },
+        },
+        {
+            'name': 'task4.main',
+            'generate': random_fuzzy,
+            'shrink': shrink_fuzzy,
+            'reference': reference_fuzzy,
+            'backends': {
+                'main': lambda case: [task4.main(*case[0], value) for value in case[1]],
+                'controller': fuzzy_controller,
+                'compiled': compiled_controller,
+            },
+        },
+    ]
+    if importlib.util.find_spec('numpy') is not None:
+        checks.append({
+            # evaluate_batch всегда отдаёт float
+            'name': 'task4.main (float)',
+            'generate': random_fuzzy,
+            'shrink': shrink_fuzzy,
+            'reference': lambda case: [float(value) for value in reference_fuzzy(case)],
+            'backends': {
+                'compiled_batch': compiled_batch,
+            },
+        })
+    return checks
+
+
+# ---------------------------------------------------------------- запуск
+
+def outcome(function: Callable, case) -> str:
+    """
+    repr результата или имя исключения — для побитового сравнения.
+    """
+    try:
+        return repr(function(case))
+    except Exception as error:
+        return f'<{type(error).__name__}>'
+
+
+def shrink(case, shrinker: Callable, fails: Callable) -> object:
+    """
+    Жадное сокращение: переходим к первому меньшему случаю, на котором ошибка сохраняется.
+    """
+    progress = True
+    while progress:
+        progress = False
+        for smaller in shrinker(case):
+            if fails(smaller):
+                case = smaller
+                progress = True
+                break
+    return case
+
+
+def run(cases: int, seed: int, max_nodes: int, pool: bool = False, output=sys.stdout) -> int:
+    """
+    Прогоняет все свойства; возвращает число найденных расхождений.
+    """
+    failures = 0
+    for prop in properties(pool):
+        rnd = random.Random(seed)
+        timings = defaultdict(float)
+        failed = set()
+        for _ in range(cases):
+            case = prop['generate'](rnd, max_nodes)
+            started = time.perf_counter()
+            expected = outcome(prop['reference'], case)
+            timings['reference'] += time.perf_counter() - started
+
+            for name, backend in prop['backends'].items():
+                started = time.perf_counter()
+                actual = outcome(backend, case)
+                timings[name] += time.perf_counter() - started
+                if actual == expected or name in failed:
+                    continue
+
+                failed.add(name)
+                failures += 1
+                minimal = shrink(
+                    case, prop['shrink'],
+                    lambda smaller: outcome(backend, smaller) != outcome(prop['reference'], smaller)
+                )
+                print(f'РАСХОЖДЕНИЕ {prop["name"]} / {name}', file=output)
+                print(f'  случай:   {minimal!r}', file=output)
+                print(f'  эталон:   {outcome(prop["reference"], minimal)}', file=output)
+                print(f'  получено: {outcome(backend, minimal)}', file=output)
+
+        reference_time = timings['reference']
+        print(f'{prop["name"]}: {cases} случаев', file=output)
+        for name, seconds in timings.items():
+            speedup = f', x{reference_time / seconds:.1f} к эталону' if name != 'reference' and seconds else ''
+            status = ' РАСХОЖДЕНИЕ' if name in failed else ''
+            print(f'  {name:16} {cases / seconds if seconds else float("inf"):10.1f} случаев/с{speedup}{status}',
+                  file=output)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Дифференциальная проверка быстрых реализаций против эталона')
+    parser.add_argument('--cases', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-nodes', type=int, default=24)
+    parser.add_argument('--pool', action='store_true', help='проверять и умножение через пул процессов')
+    args = parser.parse_args()
+
+    sys.exit(1 if run(args.cases, args.seed, args.max_nodes, args.pool) else 0)
@@ -0,0 +1,112 @@
+"""
+Анализ файла рёбер (формат task0/task2.csv: "руководитель,подчинённый" в строке),
+содержащего много несвязанных деревьев (лес).
+
+За один потоковый проход по файлу система непересекающихся множеств собирает
+компоненты связности и считает входящие рёбра. Корень компоненты — первая встреченная
+вершина без входящих рёбер (если таких нет — первая встреченная вершина компоненты).
+Затем компоненты анализируются параллельно в пуле процессов функцией main выбранной
+задачи (task1 — матрицы, task2 — энтропия); крупные компоненты отправляются первыми,
+чтобы пул не простаивал в конце на одной большой задаче. Вместе с результатом
+возвращаются идентификаторы вершин компоненты в порядке строк и столбцов матриц task1.
+
+Пример:
+  python forest.py task0/task2.csv --task task2 --processes 8
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import argparse
+import csv
+import json
+
+from loader import load_task
+
+
+def find_components(path: str) -> List[Tuple[str, List[Tuple[str, str]]]]:
+    """
+    Один проход по файлу: возвращает список (корень, рёбра) по компонентам
+    в порядке их первого появления в файле.
+    """
+    parent: Dict[str, str] = {}
+    has_manager: Dict[str, bool] = {}
+    edges: List[Tuple[str, str]] = []
+
+    def find(v: str) -> str:
+        root = v
+        while parent[root] != root:
+            root = parent[root]
+        while parent[v] != root:
+            parent[v], v = root, parent[v]
+        return root
+
+    with open(path, newline='') as file:
+        for row in csv.reader(file):
+            if len(row) < 2:
+                continue
+            left, right = row[0].strip(), row[1].strip()
+            for v in (left, right):
+                if v not in parent:
+                    parent[v] = v
+                    has_manager[v] = False
+            has_manager[right] = True
+            edges.append((left, right))
+            a, b = find(left), find(right)
+            if a != b:
+                parent[b] = a
+
+    # вершины в порядке первого появления (порядок вставки в словарь)
+    components: Dict[str, Tuple[List[str], List[Tuple[str, str]]]] = {}
+    for v in parent:
+        components.setdefault(find(v), ([], []))[0].append(v)
+    for left, right in edges:
+        components[find(left)][1].append((left, right))
+
+    result = []
+    for nodes, component_edges in components.values():
+        root = next((v for v in nodes if not has_manager[v]), nodes[0])
+        result.append((root, component_edges))
+    return result
+
+
+def analyse_component(task: str, root: str, edges: List[Tuple[str, str]]):
+    """
+    main задачи task для одной компоненты.
+    """
+    return load_task(task).main('\n'.join(f'{left},{right}' for left, right in edges), root)
+
+
+def component_ids(root: str, edges: List[Tuple[str, str]]) -> List[str]:
+    """
+    Отсортированные идентификаторы вершин компоненты — порядок строк и столбцов
+    матриц task1 (graph нумерует вершины так же).
+    """
+    return sorted({v for edge in edges for v in edge} | {root})
+
+
+def analyse_forest(path: str, task: str = 'task2', processes: int = None) -> Dict[str, Dict[str, object]]:
+    """
+    Находит компоненты леса и анализирует их параллельно.
+
+    :return: словарь корень компоненты -> {'ids': component_ids, 'result': результат main задачи}
+             (в порядке появления компонент в файле)
+    """
+    components = find_components(path)
+    # крупные компоненты первыми: очередь пула обрабатывается в порядке отправки
+    scheduled = sorted(components, key=lambda component: len(component[1]), reverse=True)
+
+    with ProcessPoolExecutor(processes) as pool:
+        futures = {root: pool.submit(analyse_component, task, root, edges) for root, edges in scheduled}
+        return {
+            root: {'ids': component_ids(root, edges), 'result': futures[root].result()}
+            for root, edges in components
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Параллельный анализ леса оргструктур из одного файла рёбер')
+    parser.add_argument('path')
+    parser.add_argument('--task', default='task2', choices=('task1', 'task2'))
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    print(json.dumps(analyse_forest(args.path, args.task, args.processes), ensure_ascii=False))
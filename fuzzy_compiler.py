@@ -0,0 +1,226 @@
+"""
+Компилятор описаний нечеткого контроллера task4 в специализированный код на Python.
+
+task4.infer на каждое значение заново обходит словари и списки описаний
+(T_FUNC, TERM_FUNC, DIRECT_MAP). Здесь описание разбирается один раз, и генерируется
+модуль с развёрнутой функцией evaluate(x): все опорные точки, наклоны и разности
+подставлены константами, каждый отрезок функции принадлежности — отдельная ветка,
+правила — цепочка max по локальным переменным. Вычисления повторяют infer операция
+в операцию, поэтому результат совпадает с task4.main побитово.
+
+Дополнительно генерируется evaluate_batch(values) — векторная версия на NumPy
+(numpy импортируется только при её вызове). Для значений, где main возбудил бы
+IndexError (нет ни одной точки усеченных функций или у выходного терма пустой
+список точек), она возвращает nan вместо исключения.
+
+Сгенерированный код кешируется на диске (каталог FUZZY_COMPILER_CACHE или
+~/.cache/system-analysis/fuzzy) под sha256 от канонического JSON описаний и версии
+компилятора, так что повторная компиляция того же описания — только импорт файла.
+
+Пример:
+  controller = fuzzy_compiler.compile_controller(T_FUNC, TERM_FUNC, DIRECT_MAP)
+  controller.evaluate(19)
+"""
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+
+# Увеличивать при любом изменении генерируемого кода
+COMPILER_VERSION = 3
+
+DEFAULT_DIRECTORY = os.environ.get(
+    'FUZZY_COMPILER_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'system-analysis', 'fuzzy')
+)
+
+_compiled: Dict[str, ModuleType] = {}
+
+
+def spec_key(temperature_mfs_json: str, heating_mfs_json: str, rules_json: str) -> str:
+    """
+    sha256 от канонического JSON описаний (без учёта форматирования) и версии компилятора.
+    """
+    canonical = json.dumps(
+        [COMPILER_VERSION] + [json.loads(spec) for spec in (temperature_mfs_json, heating_mfs_json, rules_json)],
+        ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def plan(
+    temperature_mfs_json: str,
+    heating_mfs_json: str,
+    rules_json: str
+) -> Tuple[List[Tuple[str, list]], Dict[str, List[Optional[str]]], List[Tuple[list, str]]]:
+    """
+    Разбор описаний в том же порядке, что и в task4.infer.
+
+    :return: (входы: [(переменная, отсортированные точки)],
+              уровни: выходной терм -> переменные степеней по правилам (None — 0.0),
+              выходы: [(точки, переменная уровня)] в порядке activations)
+    """
+    input_mfs = json.loads(temperature_mfs_json)["температура"]
+    output_mfs = json.loads(heating_mfs_json)["температура"]
+    rules = json.loads(rules_json)
+
+    # при повторе id в input_degrees остаётся последний терм
+    inputs = [(f'd{k}', sorted(element["points"], key=lambda p: p[0])) for k, element in enumerate(input_mfs)]
+    degree_of = {element["id"]: f'd{k}' for k, element in enumerate(input_mfs)}
+
+    levels: Dict[str, List[Optional[str]]] = {}
+    for input_term, output_term_raw in rules:
+        output_term = (output_term_raw[:-1] + "ый") if output_term_raw[-1] == "о" else output_term_raw
+        levels.setdefault(output_term, []).append(degree_of.get(input_term))
+
+    # activations: ключи — в порядке первого появления id, значения — от последнего
+    activations = {}
+    for element in output_mfs:
+        activations[element["id"]] = element["points"]
+    level_names = {term: f'l{k}' for k, term in enumerate(levels)}
+    outputs = [(points, level_names.get(term_id)) for term_id, points in activations.items()]
+    return inputs, levels, outputs
+
+
+def generate_source(temperature_mfs_json: str, heating_mfs_json: str, rules_json: str) -> str:
+    """
+    Исходный код модуля с функциями evaluate(x) и evaluate_batch(values).
+    """
+    inputs, levels, outputs = plan(temperature_mfs_json, heating_mfs_json, rules_json)
+    used = {name for sources in levels.values() for name in sources if name is not None}
+    level_names = {term: f'l{k}' for k, term in enumerate(levels)}
+
+    scalar = ['def evaluate(x, max=max):', '    # фаззификация']
+    vector = ['def evaluate_batch(values):', '    import numpy as np', '',
+              '    x = np.asarray(values, dtype=float)', '    # фаззификация']
+
+    for name, points in inputs:
+        if name not in used:
+            continue
+        if not points:
+            scalar.append(f'    {name} = 0.0')
+            vector.append(f'    {name} = np.zeros_like(x)')
+            continue
+        first, last = points[0][0], points[-1][0]
+        scalar.append(f'    if x < {first!r} or x > {last!r}:')
+        scalar.append(f'        {name} = 0.0')
+        vector.append(f'    {name} = np.zeros_like(x)')
+        branches = []
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            if x1 == x2:
+                value = repr(max(y1, y2))
+            else:
+                value = f'{y1!r} + {(y2 - y1) / (x2 - x1)!r} * (x - {x1!r})'
+            scalar.append(f'    elif {x1!r} <= x <= {x2!r}:')
+            scalar.append(f'        {name} = {value}')
+            branches.append(f'    {name} = np.where(({x1!r} <= x) & (x <= {x2!r}), {value}, {name})')
+        scalar.append('    else:')
+        scalar.append(f'        {name} = 0.0')
+        # первый подходящий отрезок побеждает, поэтому в векторной версии — в обратном порядке
+        vector.extend(reversed(branches))
+        vector.append(f'    {name} = np.where((x < {first!r}) | (x > {last!r}), 0.0, {name})')
+
+    scalar.append('    # уровни активации')
+    vector.append('    # уровни активации')
+    for term, sources in levels.items():
+        level = level_names[term]
+        scalar.append(f'    {level} = 0.0')
+        vector.append(f'    {level} = np.zeros_like(x)')
+        for source in sources:
+            scalar.append(f'    {level} = max({level}, {source or "0.0"})')
+            # max из Python: nan побеждает, только если стоит первым
+            vector.append(f'    {level} = np.where({source or "0.0"} > {level}, {source or "0.0"}, {level})')
+
+    scalar.append('    # усечение выходных функций и первый максимум')
+    scalar.append('    bx = by = None')
+    vector.append('    # усечение выходных функций и первый максимум')
+    vector.append('    bx = np.full_like(x, np.nan)')
+    vector.append('    by = np.full_like(x, np.nan)')
+    vector.append('    found = np.zeros(x.shape, dtype=bool)')
+
+    def candidate(indent: str, condition: Optional[str], px: str, py: str):
+        # точка (px, py) — кандидат в первый максимум, если выполнено condition
+        inner = indent + '    ' if condition else indent
+        if condition:
+            scalar.append(f'{indent}if {condition}:')
+        scalar.append(f'{inner}if by is None or by < {py} or (by == {py} and bx > {px}):')
+        scalar.append(f'{inner}    bx = {px}')
+        scalar.append(f'{inner}    by = {py}')
+
+        mask = f'({condition})' if condition else 'np.ones(x.shape, dtype=bool)'
+        vector.append(f'    c = {mask}')
+        vector.append(f'    u = c & (~found | (by < {py}) | ((by == {py}) & (bx > {px})))')
+        vector.append(f'    bx = np.where(u, {px}, bx)')
+        vector.append(f'    by = np.where(u, {py}, by)')
+        vector.append('    found |= c')
+
+    for points, level in outputs:
+        if not points:
+            # main падает на таком терме при любом x
+            scalar.append("    raise IndexError('list index out of range')")
+            vector.append('    return np.full_like(x, np.nan)')
+            break
+        L = level or '0.0'
+        x0, y0 = points[0]
+        candidate('    ', f'{y0!r} > {L}', repr(x0), L)
+        for x1, y1 in points:
+            if y0 != y1:
+                scalar.append(f'    if ({y1!r} - {L}) * ({y0!r} - {L}) < 0:')
+                scalar.append(f'        px = {x1!r} + ({L} - {y1!r}) * {x0 - x1!r} / {y0 - y1!r}')
+                vector.append(f'    px = {x1!r} + ({L} - {y1!r}) * {x0 - x1!r} / {y0 - y1!r}')
+                # кандидат — точка пересечения с уровнем
+                scalar.append(f'        if by is None or by < {L} or (by == {L} and bx > px):')
+                scalar.append('            bx = px')
+                scalar.append(f'            by = {L}')
+                vector.append(f'    c = ({y1!r} - {L}) * ({y0!r} - {L}) < 0')
+                vector.append(f'    u = c & (~found | (by < {L}) | ((by == {L}) & (bx > px)))')
+                vector.append('    bx = np.where(u, px, bx)')
+                vector.append(f'    by = np.where(u, {L}, by)')
+                vector.append('    found |= c')
+            candidate('    ', f'{y1!r} <= {L}', repr(x1), repr(y1))
+            x0, y0 = x1, y1
+        candidate('    ', f'{y0!r} > {L}', repr(x0), L)
+
+    scalar.append('    if bx is None:')
+    scalar.append("        raise IndexError('list index out of range')")
+    scalar.append('    return bx')
+    vector.append('    return bx')
+    # inf и nan в точках дают 0 * inf и т.п.; скалярная версия считает их молча
+    vector[4:] = ['    with np.errstate(all=\'ignore\'):'] + ['    ' + line for line in vector[4:]]
+
+    # json.loads принимает Infinity и NaN, а repr таких чисел — имена inf и nan
+    header = [f'# Сгенерировано fuzzy_compiler (версия {COMPILER_VERSION}). Не редактировать.',
+              'from math import inf, nan', '', '']
+    return '\n'.join(header + scalar + ['', ''] + vector) + '\n'
+
+
+def compile_controller(
+    temperature_mfs_json: str,
+    heating_mfs_json: str,
+    rules_json: str,
+    directory: str = DEFAULT_DIRECTORY
+) -> ModuleType:
+    """
+    Возвращает скомпилированный модуль (функции evaluate и evaluate_batch), при
+    необходимости генерируя его и сохраняя в кеш на диске.
+    """
+    key = spec_key(temperature_mfs_json, heating_mfs_json, rules_json)
+    if key in _compiled:
+        return _compiled[key]
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'fuzzy_{key}.py')
+    if not os.path.exists(path):
+        source = generate_source(temperature_mfs_json, heating_mfs_json, rules_json)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(source)
+        os.replace(temp_path, path)
+
+    spec = importlib.util.spec_from_file_location(f'fuzzy_{key}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _compiled[key] = module
+    return module
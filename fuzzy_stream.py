@@ -0,0 +1,170 @@
+"""
+Потоковый нечеткий вывод (task4) по файлам временных рядов температуры.
+
+Источники читаются порциями (chunk), поэтому потребление памяти ограничено размером
+порции и не зависит от длины файла:
+  - CSV: одно значение температуры в колонке column на строку; нечисловая первая строка
+    считается заголовком и пропускается, а пустое или нечисловое значение дальше —
+    пропуск показания — читается как nan;
+  - бинарный файл: плотный массив чисел (по умолчанию float64, 'd'), читается через mmap
+    без копирования.
+
+Результаты пишутся по мере вычисления: в CSV ("температура,воздействие"), если имя
+выходного файла оканчивается на .csv, иначе — плотным массивом float64. На каждое
+входное значение приходится ровно одно выходное, для nan на входе — nan.
+
+Пример:
+  python fuzzy_stream.py readings.csv controls.csv
+  python fuzzy_stream.py readings.bin controls.bin --binary
+"""
+from array import array
+from typing import Callable, Iterator, List, Sequence, Tuple
+import argparse
+import csv
+import importlib.util
+import math
+import mmap
+import sys
+import time
+
+from loader import load_task
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def read_csv_chunks(path: str, column: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[float]]:
+    """
+    Читает колонку column CSV-файла порциями по chunk_size значений. Нечисловая первая
+    строка (заголовок) пропускается, остальные нечисловые значения дают nan, чтобы
+    выход оставался выровнен со строками входа.
+    """
+    with open(path, newline='') as file:
+        chunk: List[float] = []
+        for line, row in enumerate(csv.reader(file)):
+            try:
+                chunk.append(float(row[column]))
+            except (IndexError, ValueError):
+                if line == 0:
+                    continue
+                chunk.append(math.nan)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def read_binary_chunks(path: str, typecode: str = 'd', chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[memoryview]:
+    """
+    Отображает бинарный файл в память и отдаёт его порциями-срезами memoryview.
+    Размер файла должен быть кратен размеру элемента typecode, иначе ValueError.
+    """
+    itemsize = array(typecode).itemsize
+    with open(path, 'rb') as file:
+        size = file.seek(0, 2)
+        if size % itemsize:
+            raise ValueError(f'{path}: размер {size} байт не кратен размеру элемента {typecode!r} '
+                             f'({itemsize} байт), файл обрезан или имеет другой формат')
+        if not size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            values = memoryview(mapped).cast(typecode)
+            try:
+                for start in range(0, len(values), chunk_size):
+                    chunk = values[start:start + chunk_size]
+                    try:
+                        yield chunk
+                    finally:
+                        chunk.release()
+            finally:
+                values.release()
+
+
+def infer_chunk(controller: Callable[[float], float], chunk: Sequence[float]) -> List[float]:
+    """
+    Пакетный вывод для порции значений. Контроллер с состоянием (task4.fuzzy_controller)
+    сохраняется между порциями: соседние показания почти не отличаются, и большую часть
+    вычислений он переиспользует. Пропуски показаний (nan) дают nan и не трогают его.
+    """
+    return [math.nan if math.isnan(value) else controller(value) for value in chunk]
+
+
+def infer_batch(batch: Callable, chunk: Sequence[float]) -> List[float]:
+    """
+    Векторный вывод для порции (evaluate_batch из fuzzy_compiler), nan на входе даёт nan.
+    Представление NumPy над порцией живёт только внутри вызова: иначе mmap бинарного
+    файла нельзя закрыть.
+    """
+    import numpy as np
+
+    values = np.asarray(chunk, dtype=float)
+    return np.where(np.isnan(values), np.nan, batch(values)).tolist()
+
+
+def run(
+    input_path: str,
+    output_path: str,
+    temperature_mfs_json: str = None,
+    heating_mfs_json: str = None,
+    rules_json: str = None,
+    binary: bool = False,
+    column: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    compiled: bool = False
+) -> Tuple[int, float, float]:
+    """
+    Прогоняет весь файл через контроллер и пишет результаты в output_path.
+    Описания по умолчанию — T_FUNC, TERM_FUNC, DIRECT_MAP из task4.
+    С compiled=True используется код, сгенерированный fuzzy_compiler, вместо
+    контроллера с состоянием; если установлен NumPy, порция обрабатывается целиком
+    векторной evaluate_batch (значения, на которых main упал бы, дают nan).
+
+    :return: (число показаний, время в секундах, показаний в секунду)
+    """
+    task4 = load_task('task4')
+    specs = (
+        temperature_mfs_json or task4.T_FUNC,
+        heating_mfs_json or task4.TERM_FUNC,
+        rules_json or task4.DIRECT_MAP
+    )
+    batch = None
+    if compiled:
+        import fuzzy_compiler
+        module = fuzzy_compiler.compile_controller(*specs)
+        controller = module.evaluate
+        if importlib.util.find_spec('numpy') is not None:
+            batch = module.evaluate_batch
+    else:
+        controller = task4.fuzzy_controller(*task4.parse_specs(*specs))
+    chunks = read_binary_chunks(input_path, chunk_size=chunk_size) if binary \
+        else read_csv_chunks(input_path, column, chunk_size)
+    as_csv = output_path.lower().endswith('.csv')
+
+    count = 0
+    started = time.perf_counter()
+    with open(output_path, 'w', newline='') if as_csv else open(output_path, 'wb') as output:
+        writer = csv.writer(output) if as_csv else None
+        for chunk in chunks:
+            results = infer_batch(batch, chunk) if batch else infer_chunk(controller, chunk)
+            if as_csv:
+                writer.writerows(zip(chunk, results))
+            else:
+                array('d', results).tofile(output)
+            count += len(results)
+    elapsed = time.perf_counter() - started
+    return count, elapsed, count / elapsed if elapsed else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Потоковый нечеткий вывод по файлу показаний температуры')
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--binary', action='store_true', help='вход — массив float64, а не CSV')
+    parser.add_argument('--column', type=int, default=0, help='номер колонки температуры в CSV')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--compiled', action='store_true', help='использовать сгенерированный код контроллера')
+    args = parser.parse_args()
+
+    count, elapsed, rate = run(args.input, args.output, binary=args.binary,
+                               column=args.column, chunk_size=args.chunk_size, compiled=args.compiled)
+    print(f'{count} показаний за {elapsed:.3f} с ({rate:.0f} показаний/с)', file=sys.stderr)
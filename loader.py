@@ -0,0 +1,30 @@
+"""
+Загрузка модулей задач (task1/task.py, task2/task.py, ...) по пути.
+
+У всех задач модуль называется одинаково — task, поэтому обычный import
+не может держать их одновременно; каждый загружается под именем "<задача>_task".
+"""
+from types import ModuleType
+from typing import Dict
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_modules: Dict[str, ModuleType] = {}
+
+
+def load_task(name: str) -> ModuleType:
+    """
+    Возвращает модуль name/task.py (например, load_task("task1")), загружая его один раз.
+    """
+    if name not in _modules:
+        path = os.path.join(ROOT, name, 'task.py')
+        spec = importlib.util.spec_from_file_location(f'{name}_task', path)
+        module = importlib.util.module_from_spec(spec)
+        # регистрация нужна, чтобы функции модуля можно было передавать в пул процессов
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        _modules[name] = module
+    return _modules[name]
@@ -0,0 +1,238 @@
+"""
+Компактная сериализация матриц отношений task1 (List[List[bool]]).
+
+Файл содержит несколько квадратных матриц N x N, каждая в своей кодировке:
+  PACKED    — строки упакованными битами, ceil(N / 8) байт на строку;
+  CSR       — смещения строк (N + 1) и номера столбцов единиц (uint32);
+  INTERVALS — перестановка вершин order, а для каждой строки — отрезки [start, stop)
+              подряд идущих единиц в этой перестановке. Для транзитивного управления
+              в дереве при order = прямой обход (см. tree_order) каждая строка — один
+              отрезок: потомки вершины идут в обходе подряд.
+
+Формат (все числа little-endian):
+  заголовок  <4s B B I>      : магия, версия, число матриц M, N
+  M записей  <B Q Q>         : кодировка, смещение данных, длина данных
+  данные матриц, каждая выровнена на 8 байт
+
+load() отображает файл в память (mmap), и матрицы читаются через memoryview без
+копирования; to_lists() восстанавливает точно такой же List[List[bool]].
+"""
+from array import array
+from typing import List, Optional, Sequence
+import mmap
+import struct
+import sys
+
+from loader import load_task
+
+MAGIC = b'SARF'
+VERSION = 1
+HEADER = struct.Struct('<4sBBI')
+ENTRY = struct.Struct('<BQQ')
+
+PACKED = 1
+CSR = 2
+INTERVALS = 3
+
+Matrix = List[List[bool]]
+
+
+def _uint32(values) -> bytes:
+    data = array('I', values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _as_uint32(view: memoryview):
+    # без копирования на little-endian машинах
+    if sys.byteorder == 'little':
+        return view.cast('I')
+    data = array('I', view.tobytes())
+    data.byteswap()
+    return data
+
+
+def tree_order(direct: Matrix) -> List[int]:
+    """
+    Прямой обход леса по матрице прямого управления R1: потомки каждой вершины
+    образуют в нём непрерывный отрезок, что делает кодировку INTERVALS для R3
+    (по одному отрезку на строку) и R4 компактной.
+    """
+    N = len(direct)
+    has_manager = [False] * N
+    for row in direct:
+        for j, value in enumerate(row):
+            if value:
+                has_manager[j] = True
+
+    order: List[int] = []
+    seen = [False] * N
+    for start in [v for v in range(N) if not has_manager[v]] + list(range(N)):
+        if seen[start]:
+            continue
+        stack = [start]
+        seen[start] = True
+        while stack:
+            v = stack.pop()
+            order.append(v)
+            for u in reversed([j for j, value in enumerate(direct[v]) if value and not seen[j]]):
+                seen[u] = True
+                stack.append(u)
+    return order
+
+
+def encode_packed(matrix: Matrix) -> bytes:
+    W = (len(matrix) + 7) // 8
+    return b''.join(row.to_bytes(W, 'little') for row in load_task('task1').pack_matrix(matrix))
+
+
+def encode_csr(matrix: Matrix) -> bytes:
+    offsets = [0]
+    columns: List[int] = []
+    for row in matrix:
+        columns.extend(j for j, value in enumerate(row) if value)
+        offsets.append(len(columns))
+    return _uint32(offsets) + _uint32(columns)
+
+
+def encode_intervals(matrix: Matrix, order: Sequence[int] = None) -> bytes:
+    N = len(matrix)
+    order = list(range(N)) if order is None else list(order)
+    offsets = [0]
+    runs: List[int] = []
+    for row in matrix:
+        start = None
+        for p, j in enumerate(order):
+            if row[j]:
+                if start is None:
+                    start = p
+            elif start is not None:
+                runs.extend((start, p))
+                start = None
+        if start is not None:
+            runs.extend((start, N))
+        offsets.append(len(runs) // 2)
+    return _uint32(order) + _uint32(offsets) + _uint32(runs)
+
+
+ENCODERS = {
+    PACKED: lambda matrix, order: encode_packed(matrix),
+    CSR: lambda matrix, order: encode_csr(matrix),
+    INTERVALS: encode_intervals,
+}
+
+
+def dump(path: str, matrices: Sequence[Matrix], encodings: Sequence[Optional[int]] = None,
+         order: Sequence[int] = None):
+    """
+    Записывает матрицы в файл path.
+
+    :param encodings: кодировка для каждой матрицы (PACKED / CSR / INTERVALS); None —
+                      выбрать самую компактную
+    :param order: перестановка вершин для INTERVALS (например, tree_order(R1))
+    """
+    encodings = list(encodings) if encodings is not None else [None] * len(matrices)
+    N = len(matrices[0]) if matrices else 0
+
+    blobs = []
+    for matrix, encoding in zip(matrices, encodings):
+        if encoding is None:
+            encoding, data = min(
+                ((code, encoder(matrix, order)) for code, encoder in ENCODERS.items()),
+                key=lambda candidate: len(candidate[1])
+            )
+        else:
+            data = ENCODERS[encoding](matrix, order)
+        blobs.append((encoding, data))
+
+    position = HEADER.size + ENTRY.size * len(blobs)
+    entries = []
+    for encoding, data in blobs:
+        position += -position % 8
+        entries.append((encoding, position, len(data)))
+        position += len(data)
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(blobs), N))
+        for entry in entries:
+            file.write(ENTRY.pack(*entry))
+        for (_, offset, _), (_, data) in zip(entries, blobs):
+            file.write(b'\0' * (offset - file.tell()))
+            file.write(data)
+
+
+class relation_view:
+    """
+    Матрица отношения поверх memoryview без распаковки целиком.
+    """
+
+    def __init__(self, encoding: int, N: int, data: memoryview):
+        self.encoding = encoding
+        self.N = N
+        if encoding == PACKED:
+            self.W = (N + 7) // 8
+            self.data = data
+        elif encoding == CSR:
+            self.offsets = _as_uint32(data[:4 * (N + 1)])
+            self.columns = _as_uint32(data[4 * (N + 1):])
+        elif encoding == INTERVALS:
+            self.order = _as_uint32(data[:4 * N])
+            self.offsets = _as_uint32(data[4 * N:4 * (2 * N + 1)])
+            self.runs = _as_uint32(data[4 * (2 * N + 1):])
+        else:
+            raise ValueError(f'неизвестная кодировка {encoding}')
+
+    def __len__(self) -> int:
+        return self.N
+
+    def columns_of(self, i: int) -> List[int]:
+        """
+        Номера столбцов с True в строке i.
+        """
+        if self.encoding == PACKED:
+            row = int.from_bytes(self.data[i * self.W:(i + 1) * self.W], 'little')
+            result = []
+            while row:
+                low = row & -row
+                result.append(low.bit_length() - 1)
+                row ^= low
+            return result
+        if self.encoding == CSR:
+            return list(self.columns[self.offsets[i]:self.offsets[i + 1]])
+        result = []
+        for k in range(self.offsets[i], self.offsets[i + 1]):
+            result.extend(self.order[self.runs[2 * k]:self.runs[2 * k + 1]])
+        return result
+
+    def __getitem__(self, i: int) -> List[bool]:
+        if self.encoding == PACKED:
+            packed = int.from_bytes(self.data[i * self.W:(i + 1) * self.W], 'little')
+            # плотную строку быстрее распаковать целиком, чем ставить единицы по одной
+            if bin(packed).count('1') * 16 > self.N:
+                return list(map(bool, load_task('task1').unpack_bytes(packed, self.N)))
+        row = [False] * self.N
+        for j in self.columns_of(i):
+            row[j] = True
+        return row
+
+    def to_lists(self) -> Matrix:
+        return [self[i] for i in range(self.N)]
+
+
+def load(path: str) -> List[relation_view]:
+    """
+    Открывает файл через mmap и возвращает представления всех матриц.
+    """
+    with open(path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    magic, version, count, N = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path}: неподдерживаемый формат')
+
+    result = []
+    for k in range(count):
+        encoding, offset, length = ENTRY.unpack_from(view, HEADER.size + ENTRY.size * k)
+        result.append(relation_view(encoding, N, view[offset:offset + length]))
+    return result
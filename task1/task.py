@@ -1,8 +1,11 @@
-from typing import List, Tuple, Set, DefaultDict
-from collections import defaultdict
-import sys
+from typing import List, Tuple, Set, Dict
+from array import array
+from bisect import bisect_left
 import copy
 
+# Ниже этого размера процессы не окупаются, умножаем в текущем процессе
+PARALLEL_THRESHOLD = 256
+
 def transpose(A: List[List[bool]]) -> List[List[bool]]:
     result = A
     for i, v1 in enumerate(result):
@@ -32,48 +35,339 @@ def bool_sum(A: List[List[bool]], B: List[List[bool]]) -> List[List[bool]]:
 
     return result
 
+# Таблицы перевода между байтами 0/1 и цифрами двоичной записи
+_BITS = bytes.maketrans(b'\x00\x01', b'01')
+_BYTES = bytes.maketrans(b'01', b'\x00\x01')
+
+def pack_bytes(row: bytes) -> int:
+    # Строка из байтов 0/1 -> целое число, бит j которого равен row[j]
+    return int(row[::-1].translate(_BITS) or b'0', 2)
+
+def unpack_bytes(row: int, N: int) -> bytes:
+    return format(row, f'0{N}b')[::-1].encode('ascii').translate(_BYTES) if N else b''
+
+def pack_matrix(A: List[List[bool]]) -> List[int]:
+    # Строка матрицы -> целое число, бит j которого равен A[i][j]
+    return [pack_bytes(bytes(row)) for row in A]
+
+def unpack_matrix(rows: List[int], N: int) -> List[List[bool]]:
+    return [list(map(bool, unpack_bytes(row, N))) for row in rows]
+
+def multiply_packed_row(row: int, B) -> int:
+    # OR строк B, соответствующих установленным битам строки A
+    result = 0
+    while row:
+        low = row & -row
+        result |= B[low.bit_length() - 1]
+        row ^= low
+    return result
+
+def packed_sum(A: List[int], B: List[int]) -> List[int]:
+    return [a | b for a, b in zip(A, B)]
+
+
+class _lazy_rows(dict):
+    # Строки B разбираются при первом обращении: воркер декодирует только те строки,
+    # на которые ссылаются строки A его блоков, и не больше одного раза за умножение
+    def __init__(self, memory, width: int, packed: bool):
+        super().__init__()
+        self.memory = memory
+        self.width = width
+        self.packed = packed
+
+    def __missing__(self, k: int) -> int:
+        data = self.memory.buf[k * self.width:(k + 1) * self.width]
+        row = self[k] = int.from_bytes(data, 'little') if self.packed else pack_bytes(bytes(data))
+        return row
+
+_worker_state = {'memory': {}, 'call': None, 'rows': None}
+
+def _attach(names: Tuple[str, str, str]) -> list:
+    from multiprocessing import shared_memory
+    memory = _worker_state['memory']
+    for name in list(memory):
+        if name not in names:
+            memory.pop(name).close()
+    for name in names:
+        if name not in memory:
+            memory[name] = shared_memory.SharedMemory(name=name)
+    return [memory[name] for name in names]
+
+def _multiply_row_block(task: tuple) -> bool:
+    # Задача — имена буферов, номер вызова и диапазон строк; данные матриц не пересылаются.
+    # 'packed': строки лежат битами по W байт; 'bool': байтами 0/1 по N байт, и воркер
+    # сам упаковывает строки своего блока и распаковывает результат;
+    # 'closure': шаг замыкания C ∪ C∘C (A и B — один буфер), возвращает, изменился ли блок.
+    names, call, mode, N, start, stop = task
+    packed = mode != 'bool'
+    if _worker_state['call'] != (names, call):
+        _worker_state['rows'] = None
+    a, b, out = _attach(names)
+    width = (N + 7) // 8 if packed else N
+    if _worker_state['rows'] is None:
+        _worker_state['rows'] = _lazy_rows(b, width, packed)
+        _worker_state['call'] = (names, call)
+    B = _worker_state['rows']
+    changed = False
+    for i in range(start, stop):
+        data = a.buf[i * width:(i + 1) * width]
+        if not packed:
+            row = multiply_packed_row(pack_bytes(bytes(data)), B)
+            out.buf[i * width:(i + 1) * width] = unpack_bytes(row, N)
+            continue
+        row = int.from_bytes(data, 'little')
+        result = multiply_packed_row(row, B)
+        if mode == 'closure':
+            result |= row
+            changed = changed or result != row
+        out.buf[i * width:(i + 1) * width] = result.to_bytes(width, 'little')
+    return changed
+
+
+class multiplication_pool:
+    # Пул процессов и три буфера shared_memory (A, B, результат), переиспользуемые между
+    # вызовами: повторные умножения (шаги замыкания, серия отношений) не платят за запуск
+    # процессов и создание памяти. Строки результата считаются блоками, задача — только (start, stop).
+    # multiprocessing импортируется лениво, чтобы не замедлять импорт модуля.
+    def __init__(self, processes: int = None, block_rows: int = None):
+        import os
+        self.processes = processes or os.cpu_count() or 1
+        self.block_rows = block_rows
+        self.pool = None
+        self.buffers = []
+        self.calls = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        for buffer in self.buffers:
+            buffer.close()
+            buffer.unlink()
+        self.buffers = []
+
+    def in_process(self, N: int) -> bool:
+        return self.processes == 1 or N == 0 or N < PARALLEL_THRESHOLD
+
+    def _buffers(self, size: int) -> list:
+        from multiprocessing import Pool, shared_memory
+        if not self.buffers or self.buffers[0].size < size:
+            for buffer in self.buffers:
+                buffer.close()
+                buffer.unlink()
+            self.buffers = [shared_memory.SharedMemory(create=True, size=size) for _ in range(3)]
+        # Пул создаётся после первой shared_memory, чтобы воркеры унаследовали
+        # общий resource_tracker и не пытались удалить буферы при завершении
+        if self.pool is None:
+            self.pool = Pool(self.processes)
+        return self.buffers
+
+    def _run(self, mode: str, N: int, names: Tuple[str, str, str] = None) -> List[bool]:
+        self.calls += 1
+        names = names or tuple(buffer.name for buffer in self.buffers)
+        block_rows = self.block_rows or max(1, -(-N // (self.processes * 4)))
+        return self.pool.map(_multiply_row_block,
+                             [(names, self.calls, mode, N, start, min(start + block_rows, N))
+                              for start in range(0, N, block_rows)])
+
+    def multiply(self, A: List[int], B: List[int]) -> List[int]:
+        # Произведение матриц в упакованном виде (строка — целое число): родитель только
+        # копирует байты строк в разделяемую память и обратно
+        N = len(A)
+        if self.in_process(N):
+            return [multiply_packed_row(row, B) for row in A]
+
+        W = (N + 7) // 8
+        a, b, out = self._buffers(N * W)
+        a.buf[:N * W] = b''.join(row.to_bytes(W, 'little') for row in A)
+        b.buf[:N * W] = b''.join(row.to_bytes(W, 'little') for row in B)
+        self._run('packed', N)
+        return [int.from_bytes(out.buf[i * W:(i + 1) * W], 'little') for i in range(N)]
+
+    def transitive_closure(self, A: List[int]) -> Tuple[List[int], int]:
+        # transitive_closure для упакованных строк: между шагами матрица остаётся в разделяемой
+        # памяти (два буфера меняются ролями), родитель только собирает флаги изменений
+        N = len(A)
+        if self.in_process(N):
+            return transitive_closure(A, multiplication=self.multiply, summation=packed_sum)
+
+        W = (N + 7) // 8
+        current, _, following = self._buffers(N * W)
+        current.buf[:N * W] = b''.join(row.to_bytes(W, 'little') for row in A)
+        iterations = 0
+        changed = True
+        while changed:
+            iterations += 1
+            changed = any(self._run('closure', N, (current.name, current.name, following.name)))
+            current, following = following, current
+        return [int.from_bytes(current.buf[i * W:(i + 1) * W], 'little') for i in range(N)], iterations
+
+    def multiply_bool(self, A: List[List[bool]], B: List[List[bool]]) -> List[List[bool]]:
+        # То же для списков bool: строки передаются байтами 0/1, упаковку и распаковку
+        # выполняют воркеры на своих блоках
+        N = len(A)
+        if self.in_process(N):
+            packed_B = pack_matrix(B)
+            return unpack_matrix([multiply_packed_row(row, packed_B) for row in pack_matrix(A)], N)
+
+        a, b, out = self._buffers(N * N)
+        a.buf[:N * N] = b''.join(map(bytes, A))
+        b.buf[:N * N] = b''.join(map(bytes, B))
+        self._run('bool', N)
+        return [list(map(bool, out.buf[i * N:(i + 1) * N])) for i in range(N)]
+
+def parallel_bool_multiplication(A: List[List[bool]], B: List[List[bool]], processes: int = None,
+                                 block_rows: int = None, pool: multiplication_pool = None) -> List[List[bool]]:
+    # То же, что bool_multiplication, но в пуле процессов. Для серии умножений лучше держать
+    # свой multiplication_pool и работать с упакованными строками (multiply), без списков bool.
+    if pool is not None:
+        return pool.multiply_bool(A, B)
+    with multiplication_pool(processes, block_rows) as pool:
+        return pool.multiply_bool(A, B)
+
+def transitive_closure(A: List[List[bool]], multiplication=bool_multiplication, summation=bool_sum,
+                       equal=lambda X, Y: X == Y) -> Tuple[List[List[bool]], int]:
+    # Замыкание R ∪ R^2 ∪ ... повторным возведением в квадрат: C = C ∪ C∘C,
+    # пока C не перестанет меняться (неподвижная точка). Достаточно ~log2(глубина) произведений.
+    # Операции передаются параметрами, чтобы работать с любым представлением матриц.
+    result = copy.deepcopy(A)
+    iterations = 0
+    while True:
+        iterations += 1
+        square = multiplication(result, result)
+        previous = copy.deepcopy(result)
+        result = summation(result, square)
+        if equal(result, previous):
+            return result, iterations
+
+
+class id_table:
+    # Отсортированные строковые идентификаторы в одном буфере байтов: ~байт на символ
+    # вместо отдельного объекта str на каждый узел
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, ids: List[str]):
+        encoded = [k.encode('utf-8') for k in ids]
+        self.data = b''.join(encoded)
+        self.offsets = array('q', [0]) * (len(encoded) + 1)
+        for i, k in enumerate(encoded):
+            self.offsets[i + 1] = self.offsets[i] + len(k)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def index(self, k: str) -> int:
+        i = bisect_left(self, k)
+        if i == len(self) or self[i] != k:
+            raise ValueError(k)
+        return i
+
 
 class graph:
-    def __init__(self, data: str, root: str):
+    # Идентификаторы интернируются в плотные целые один раз при загрузке: индекс узла —
+    # его позиция в отсортированной таблице ids (тот же порядок строк матриц, что и раньше).
+    # Дети узла i лежат в children[child_offsets[i]:child_offsets[i + 1]], родитель — в parents[i].
+    # С pool (multiplication_pool) замыкание R3 и произведение R5 считаются в пуле процессов.
+    __slots__ = ('root', 'ids', 'parents', 'child_offsets', 'children', 'pool',
+                 'direct_management_relationship', 'direct_subordination_relationship',
+                 'transitive_management_relationship', 'transitive_subordination_relationship',
+                 'single_level_subordination_matrix', 'transitive_closure_iterations')
+
+    def __init__(self, data: str, root: str, pool: multiplication_pool = None):
         self.root = root
-        self.nodes: DefaultDict[str, Set[str]] = defaultdict(set)
+        self.pool = pool
         self.direct_management_relationship = None
         self.direct_subordination_relationship = None
         self.transitive_management_relationship = None
         self.transitive_subordination_relationship = None
         self.single_level_subordination_matrix = None
-
-        for pair in list(map(str, data.split('\n'))):
-            self.append_edge(tuple(pair.split(',')))
-
-        self.remove_root(root, None)
-       ## print(self)
+        self.transitive_closure_iterations = 0
+
+        pairs = data.split('\n')
+        ids = {root}
+        for pair in pairs:
+            edge = pair.split(',')
+            ids.add(edge[0])
+            ids.add(edge[1])
+        ids = sorted(ids)
+        index = {k: i for i, k in enumerate(ids)}
+        self.ids = id_table(ids)
+        N = len(ids)
+
+        # Неориентированная смежность в виде CSR
+        heads = array('i', (index[pair.split(',')[0]] for pair in pairs))
+        tails = array('i', (index[pair.split(',')[1]] for pair in pairs))
+        offsets = array('i', [0]) * (N + 1)
+        for v in heads:
+            offsets[v + 1] += 1
+        for v in tails:
+            offsets[v + 1] += 1
+        for i in range(N):
+            offsets[i + 1] += offsets[i]
+        neighbours = array('i', [0]) * offsets[N]
+        fill = array('i', offsets)
+        for u, v in zip(heads, tails):
+            neighbours[fill[u]] = v
+            fill[u] += 1
+            neighbours[fill[v]] = u
+            fill[v] += 1
+        r = index[root]
+        del heads, tails, fill, index, ids
+
+        # Обход от корня: у каждого достижимого узла запоминаем родителя
+        self.parents = array('i', [-1]) * N
+        visited = bytearray(N)
+        visited[r] = 1
+        queue = [r]
+        for v in queue:
+            for u in neighbours[offsets[v]:offsets[v + 1]]:
+                if not visited[u]:
+                    visited[u] = 1
+                    self.parents[u] = v
+                    queue.append(u)
+        del queue, visited
+
+        # Дети — соседи без родителя (недостижимые от корня узлы сохраняют всех соседей)
+        self.child_offsets = array('i', [0]) * (N + 1)
+        self.children = array('i')
+        for v in range(N):
+            parent = self.parents[v]
+            self.children.extend(sorted({u for u in neighbours[offsets[v]:offsets[v + 1]] if u != parent}))
+            self.child_offsets[v + 1] = len(self.children)
 
     def __str__(self) -> str:
         return f'root: {self.root}, nodes: {self.nodes}\n'
 
-    def append_edge(self, edge: Tuple[str, str]):
-        self.nodes[edge[0]].add(edge[1])
-        self.nodes[edge[1]].add(edge[0])
-
-    def remove_root(self, node: str, root: str):
-        if root is not None:
-            self.nodes[node].discard(root)
+    @property
+    def nodes(self) -> Dict[str, Set[str]]:
+        return {k: {self.ids[j] for j in self.get_children(i)} for i, k in enumerate(self.ids)}
 
-        for id in self.nodes[node]:
-            self.remove_root(id, node)
+    def get_children(self, i: int) -> array:
+        return self.children[self.child_offsets[i]:self.child_offsets[i + 1]]
 
     def get_direct_management_relationship(self) -> List[List[bool]]:
         if self.direct_management_relationship is not None:
             return self.direct_management_relationship
 
-        key_map = {k: i for i, k in enumerate(sorted(self.nodes.keys()))}
-        N = len(key_map)
+        N = len(self.ids)
         self.direct_management_relationship = [[False] * N for _ in range(N)]
 
-        for id1 in self.nodes:
-            for id2 in self.nodes[id1]:
-                self.direct_management_relationship[key_map[id1]][key_map[id2]] = True
+        for i, row in enumerate(self.direct_management_relationship):
+            for j in self.get_children(i):
+                row[j] = True
 
         return self.direct_management_relationship
 
@@ -89,12 +383,12 @@ class graph:
         if self.transitive_management_relationship is not None:
             return self.transitive_management_relationship
 
-        result = copy.deepcopy(self.get_direct_management_relationship())
-        power = copy.deepcopy(self.get_direct_management_relationship())
-        N = len(result)
-        for _ in range(N):
-            result = bool_sum(result, power)
-            power = bool_multiplication(power, self.get_direct_management_relationship())
+        if self.pool is not None:
+            direct = self.get_direct_management_relationship()
+            rows, self.transitive_closure_iterations = self.pool.transitive_closure(pack_matrix(direct))
+            result = unpack_matrix(rows, len(direct))
+        else:
+            result, self.transitive_closure_iterations = transitive_closure(self.get_direct_management_relationship())
 
         self.transitive_management_relationship = result
         return self.transitive_management_relationship
@@ -111,25 +405,31 @@ class graph:
         if self.single_level_subordination_matrix is not None:
             return self.single_level_subordination_matrix
 
-        N = len(self.direct_management_relationship)
-        self.single_level_subordination_matrix = [[False] * N for _ in range(N)]
-        D = copy.deepcopy(self.get_direct_subordination_relationship())
-        Dt = copy.deepcopy(self.get_direct_management_relationship())
-        self.single_level_subordination_matrix = bool_multiplication(D, Dt)
+        N = len(self.get_direct_management_relationship())
+        if self.pool is not None:
+            # multiply_bool не меняет аргументы, копии не нужны
+            self.single_level_subordination_matrix = self.pool.multiply_bool(
+                self.get_direct_subordination_relationship(), self.get_direct_management_relationship()
+            )
+        else:
+            self.single_level_subordination_matrix = [[False] * N for _ in range(N)]
+            D = copy.deepcopy(self.get_direct_subordination_relationship())
+            Dt = copy.deepcopy(self.get_direct_management_relationship())
+            self.single_level_subordination_matrix = bool_multiplication(D, Dt)
         for k in range(N):
             self.single_level_subordination_matrix[k][k] = False
 
         return self.single_level_subordination_matrix
 
 
-def main(s: str, e: str) -> Tuple[
+def main(s: str, e: str, pool: multiplication_pool = None) -> Tuple[
     List[List[bool]],
     List[List[bool]],
     List[List[bool]],
     List[List[bool]],
     List[List[bool]]
 ]:
-    g = graph(s, e)
+    g = graph(s, e, pool)
 
     r1 = g.get_direct_management_relationship()
     r2 = g.get_direct_subordination_relationship()
@@ -1,7 +1,11 @@
-from typing import List, Tuple, Set, DefaultDict
-from collections import defaultdict
+from typing import List, Tuple, Set, Dict, Iterable, Union
+from array import array
+from bisect import bisect_left
+from collections import Counter
 import copy
+import io
 import math
+import operator
 
 
 def transpose(A: List[List[bool]]) -> List[List[bool]]:
@@ -55,18 +59,90 @@ def bool_sum(A: List[List[bool]], B: List[List[bool]]) -> List[List[bool]]:
     return result
 
 
+def transitive_closure(
+    A: List[List[bool]],
+    multiplication=bool_multiplication,
+    summation=bool_sum,
+    equal=lambda X, Y: X == Y
+) -> Tuple[List[List[bool]], int]:
+    """
+    Транзитивное замыкание R ∪ R^2 ∪ R^3 ∪ ... повторным возведением в квадрат.
+
+    На каждом шаге C = C ∪ (C ∘ C), т.е. после k шагов покрыты все степени до R^(2^k).
+    Как только C перестаёт меняться (неподвижная точка), вычисление останавливается —
+    для дерева глубины d это ~log2(d) + 1 произведений вместо N.
+
+    Операции multiplication/summation/equal передаются параметрами, поэтому функция
+    работает с любым представлением матриц (по умолчанию — списки списков bool).
+
+    Возвращает пару (замыкание, число выполненных итераций).
+    """
+    result = copy.deepcopy(A)
+    iterations = 0
+    while True:
+        iterations += 1
+        square = multiplication(result, result)
+        previous = copy.deepcopy(result)
+        result = summation(result, square)
+        if equal(result, previous):
+            return result, iterations
+
+
+class id_table:
+    """
+    Отсортированная таблица строковых идентификаторов вершин.
+
+    Все идентификаторы хранятся в одном буфере байтов с массивом смещений, т.е. ~байт
+    на символ вместо отдельного объекта str на каждую вершину. Поддерживает len(),
+    индексацию, итерацию и поиск индекса по идентификатору (бинарный поиск).
+    """
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, ids: List[str]):
+        encoded = [k.encode('utf-8') for k in ids]
+        self.data = b''.join(encoded)
+        self.offsets = array('q', [0]) * (len(encoded) + 1)
+        for i, k in enumerate(encoded):
+            self.offsets[i + 1] = self.offsets[i] + len(k)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def index(self, k: str) -> int:
+        i = bisect_left(self, k)
+        if i == len(self) or self[i] != k:
+            raise ValueError(k)
+        return i
+
+
 class graph:
     """
     Граф оргструктуры (дерево/ориентированная структура после удаления "родителя").
 
-    Входные ребра задаются как "a,b" построчно. Изначально ребра добавляются в обе стороны
-    (как неориентированные), затем выполняется remove_root, которая превращает структуру
-    в "направленное дерево" от root (удаляется ссылка обратно на родителя при обходе).
+    Входные ребра задаются как "a,b" построчно. Идентификаторы вершин один раз при загрузке
+    интернируются в плотные целые: индекс вершины — её позиция в отсортированной таблице ids
+    (этот же порядок задаёт строки и столбцы всех матриц).
 
-    После remove_root для каждой вершины node в self.nodes[node] лежит множество её "детей"
-    (т.е. тех, кем она непосредственно управляет).
+    Ребра сначала раскладываются как неориентированные, затем обходом от root у каждой
+    достижимой вершины определяется родитель, и "детьми" вершины считаются все её соседи,
+    кроме родителя (т.е. те, кем она непосредственно управляет).
+
+    Хранение компактное, на массивах array:
+      parents[i]                                    — родитель вершины i (-1 у корня)
+      children[child_offsets[i]:child_offsets[i+1]] — дети вершины i
     """
 
+    __slots__ = ('root', 'ids', 'parents', 'child_offsets', 'children',
+                 'direct_management_relationship', 'direct_subordination_relationship',
+                 'transitive_management_relationship', 'transitive_subordination_relationship',
+                 'single_level_subordination_matrix', 'transitive_closure_iterations')
+
     def __init__(self, data: str, root: str):
         """
         data: строки вида "u,v\\n u,w\\n ..."
@@ -74,9 +150,6 @@ class graph:
         """
         self.root = root
 
-        # список смежности: node -> set(neighbors)
-        self.nodes: DefaultDict[str, Set[str]] = defaultdict(set)
-
         # кеши матриц отношений (чтобы не пересчитывать многократно)
         self.direct_management_relationship = None
         self.direct_subordination_relationship = None
@@ -84,12 +157,61 @@ class graph:
         self.transitive_subordination_relationship = None
         self.single_level_subordination_matrix = None
 
-        # читаем пары "a,b" и добавляем ребро в обе стороны
-        for pair in list(map(str, data.split('\n'))):
-            self.append_edge(tuple(pair.split(',')))
-
-        # удаляем "обратные" ребра к родителю, получая иерархию от root вниз
-        self.remove_root(root, None)
+        # число итераций, затраченных на транзитивное замыкание (для диагностики)
+        self.transitive_closure_iterations = 0
+
+        # интернирование идентификаторов: строка -> индекс в отсортированном порядке
+        pairs = data.split('\n')
+        ids = {root}
+        for pair in pairs:
+            edge = pair.split(',')
+            ids.add(edge[0])
+            ids.add(edge[1])
+        ids = sorted(ids)
+        index = {k: i for i, k in enumerate(ids)}
+        self.ids = id_table(ids)
+        N = len(ids)
+
+        # неориентированная смежность в формате CSR: соседи v — neighbours[offsets[v]:offsets[v+1]]
+        heads = array('i', (index[pair.split(',')[0]] for pair in pairs))
+        tails = array('i', (index[pair.split(',')[1]] for pair in pairs))
+        offsets = array('i', [0]) * (N + 1)
+        for v in heads:
+            offsets[v + 1] += 1
+        for v in tails:
+            offsets[v + 1] += 1
+        for i in range(N):
+            offsets[i + 1] += offsets[i]
+        neighbours = array('i', [0]) * offsets[N]
+        fill = array('i', offsets)
+        for u, v in zip(heads, tails):
+            neighbours[fill[u]] = v
+            fill[u] += 1
+            neighbours[fill[v]] = u
+            fill[v] += 1
+        r = index[root]
+        del heads, tails, fill, index, ids
+
+        # обход в ширину от корня: запоминаем родителя каждой достижимой вершины
+        self.parents = array('i', [-1]) * N
+        visited = bytearray(N)
+        visited[r] = 1
+        queue = [r]
+        for v in queue:
+            for u in neighbours[offsets[v]:offsets[v + 1]]:
+                if not visited[u]:
+                    visited[u] = 1
+                    self.parents[u] = v
+                    queue.append(u)
+        del queue, visited
+
+        # дети — соседи без родителя (недостижимые от корня вершины сохраняют всех соседей)
+        self.child_offsets = array('i', [0]) * (N + 1)
+        self.children = array('i')
+        for v in range(N):
+            parent = self.parents[v]
+            self.children.extend(sorted({u for u in neighbours[offsets[v]:offsets[v + 1]] if u != parent}))
+            self.child_offsets[v + 1] = len(self.children)
 
         # отладочная печать
         #print(self)
@@ -97,28 +219,41 @@ class graph:
     def __str__(self) -> str:
         return f'root: {self.root}, nodes: {self.nodes}\n'
 
-    def append_edge(self, edge: Tuple[str, str]):
+    @property
+    def nodes(self) -> Dict[str, Set[str]]:
         """
-        Добавление ребра между двумя вершинами.
-        На этом этапе граф хранится как неориентированный.
+        Представление в виде словаря: id вершины -> множество id её детей.
+        Строится по запросу (для отладки и совместимости), в самом графе не хранится.
         """
-        self.nodes[edge[0]].add(edge[1])
-        self.nodes[edge[1]].add(edge[0])
+        return {k: {self.ids[j] for j in self.get_children(i)} for i, k in enumerate(self.ids)}
 
-    def remove_root(self, node: str, root: str):
+    def get_children(self, i: int) -> array:
+        """
+        Индексы детей вершины с индексом i.
         """
-        Рекурсивный обход, который удаляет ссылку на родителя root из множества соседей node.
+        return self.children[self.child_offsets[i]:self.child_offsets[i + 1]]
 
-        Идея:
-          - из неориентированного графа делаем ориентированную иерархию от корня:
-            у каждого узла остаются только "дети", родитель выкидывается.
+    def get_preorder(self) -> Tuple[List[int], array]:
         """
-        if root is not None:
-            self.nodes[node].discard(root)
+        Обход дерева от корня в прямом порядке (родитель раньше потомков).
 
-        # важно: после discard(root) в self.nodes[node] остаются дети
-        for child_id in self.nodes[node]:
-            self.remove_root(child_id, node)
+        Возвращает (порядок обхода, глубины вершин). Если от корня достижимы не все
+        вершины (вход — не дерево), возбуждается ValueError.
+        """
+        N = len(self.ids)
+        depths = array('i', [0]) * N
+        order: List[int] = []
+        stack = [self.ids.index(self.root)]
+        while stack:
+            v = stack.pop()
+            order.append(v)
+            for u in self.get_children(v):
+                depths[u] = depths[v] + 1
+                stack.append(u)
+
+        if len(order) != N:
+            raise ValueError(f'не все вершины достижимы из корня {self.root}')
+        return order, depths
 
     def get_direct_management_relationship(self) -> List[List[bool]]:
         """
@@ -126,20 +261,17 @@ class graph:
 
         R1[i][j] = True, если i непосредственно управляет j (j — ребёнок i).
 
-        Индексация вершин задаётся сортировкой ключей self.nodes.
+        Индексация вершин задаётся таблицей ids (отсортированные идентификаторы).
         """
         if self.direct_management_relationship is not None:
             return self.direct_management_relationship
 
-        # отображение: id_вершины -> индекс в матрице
-        key_map = {k: i for i, k in enumerate(sorted(self.nodes.keys()))}
-        N = len(key_map)
-
+        N = len(self.ids)
         self.direct_management_relationship = [[False] * N for _ in range(N)]
 
-        for id1 in self.nodes:
-            for id2 in self.nodes[id1]:
-                self.direct_management_relationship[key_map[id1]][key_map[id2]] = True
+        for i, row in enumerate(self.direct_management_relationship):
+            for j in self.get_children(i):
+                row[j] = True
 
         return self.direct_management_relationship
 
@@ -167,20 +299,17 @@ class graph:
 
         R3[i][j] = True, если i управляет j напрямую или через цепочку подчинения.
 
-        Вычисление идёт через суммирование степеней отношения:
+        Вычисление идёт через объединение степеней отношения:
           R ∪ R^2 ∪ ... ∪ R^N
-        где произведение — булева композиция.
+        где произведение — булева композиция. Степени набираются повторным возведением
+        в квадрат с остановкой в неподвижной точке (см. transitive_closure).
         """
         if self.transitive_management_relationship is not None:
             return self.transitive_management_relationship
 
-        result = copy.deepcopy(self.get_direct_management_relationship())  # накопление (R ∪ R^2 ∪ ...)
-        power = copy.deepcopy(self.get_direct_management_relationship())   # текущая степень R^k
-        N = len(result)
-
-        for _ in range(N):
-            result = bool_sum(result, power)
-            power = bool_multiplication(power, self.get_direct_management_relationship())
+        result, self.transitive_closure_iterations = transitive_closure(
+            self.get_direct_management_relationship()
+        )
 
         self.transitive_management_relationship = result
         return self.transitive_management_relationship
@@ -273,6 +402,29 @@ def main(s: str, e: str) -> Tuple[float, float]:
 
     #print(connections)
     
+    entropy_sum, h, partial_entropies = get_entropy(connections)
+    
+    #print(partial_entropies)
+    #print(entropy_sum)
+    
+    return (round(entropy_sum, 1), round(h, 1))
+
+
+def partial_entropy(count: int, max_connections: float) -> float:
+    """
+    Частичная энтропия элемента: -p * log2(p), где p = count / (N - 1).
+    """
+    p = float(count) / max_connections
+    return 0 if p == 0 else -p * math.log(p, 2)
+
+
+def get_entropy(connections: List[List[int]]) -> Tuple[float, float, List[List[float]]]:
+    """
+    Энтропия по числам связей connections[r][i] (отношение r, вершина i).
+
+    Возвращает (суммарная энтропия, нормированная энтропия h, частичные энтропии)
+    без округления.
+    """
     # Вероятности и частичные энтропии и суммарная энтропия  
     max_connections = float(len(connections[0])-1)
     partial_entropies: List[List[float]] = []
@@ -280,21 +432,354 @@ def main(s: str, e: str) -> Tuple[float, float]:
     for relations in connections:
         level_partial_entropies: List[float] = []
         for relation in relations:
-            p = float(relation) / max_connections
-            h_element = 0 if p == 0 else -p * math.log(p, 2)
+            h_element = partial_entropy(relation, max_connections)
             level_partial_entropies.append(h_element)
             entropy_sum += h_element
         
         partial_entropies.append(level_partial_entropies)
     
-    #print(partial_entropies)
-    #print(entropy_sum)
-    
     # Нормализация по эталонной мере
     h_ref = float(len(connections[0]) * 5) * 0.5307 # c = 1 / (e*ln2)
     h = entropy_sum / h_ref
     
-    return (round(entropy_sum, 1), round(h, 1))
+    return entropy_sum, h, partial_entropies
+
+
+def entropy_breakdown(s: str, e: str) -> Tuple[float, float, List[float], Dict[str, float]]:
+    """
+    Энтропия с разбивкой по уровням иерархии и по поддеревьям.
+
+    Матрицы не строятся: для дерева число связей каждой вершины v по пяти отношениям
+    выражается через структуру дерева:
+      r1 — число детей v
+      r2 — число непосредственных руководителей (1, у корня 0)
+      r3 — число потомков минус число детей
+      r4 — глубина минус число непосредственных руководителей
+      r5 — число "коллег" (детей родителя, кроме самой v)
+    Число потомков, частичные энтропии вершин, суммы по уровням и по поддеревьям
+    считаются за один обход снизу вверх, т.е. за O(N).
+
+    Возвращает:
+      entropy_sum, h   — как в main (с тем же округлением)
+      level_entropies  — level_entropies[d] — сумма частичных энтропий вершин глубины d
+      subtree_entropies — id вершины -> сумма частичных энтропий её поддерева (включая её)
+    """
+    g = graph(s, e)
+    order, depths = g.get_preorder()
+    N = len(g.ids)
+    max_connections = float(N - 1)
+
+    connections: List[List[int]] = [[0] * N for _ in range(5)]
+    descendants = array('i', [0]) * N
+    subtree_entropies = array('d', [0.0]) * N
+    level_entropies: List[float] = [0.0] * (max(depths) + 1)
+
+    for v in reversed(order):
+        parent = g.parents[v]
+        children = g.child_offsets[v + 1] - g.child_offsets[v]
+        managers = 0 if parent == -1 else 1
+        counts = (
+            children,
+            managers,
+            descendants[v] - children,
+            depths[v] - managers,
+            0 if parent == -1 else g.child_offsets[parent + 1] - g.child_offsets[parent] - 1
+        )
+        node_entropy = 0.0
+        for r, count in enumerate(counts):
+            connections[r][v] = count
+            node_entropy += partial_entropy(count, max_connections)
+
+        level_entropies[depths[v]] += node_entropy
+        subtree_entropies[v] += node_entropy
+        if parent != -1:
+            descendants[parent] += descendants[v] + 1
+            subtree_entropies[parent] += subtree_entropies[v]
+
+    # общая сумма — в том же порядке, что и в main, чтобы округление совпадало
+    entropy_sum, h, _ = get_entropy(connections)
+
+    return (
+        round(entropy_sum, 1),
+        round(h, 1),
+        level_entropies,
+        {g.ids[v]: subtree_entropies[v] for v in range(N)}
+    )
+
+
+def histogram_entropy(histogram: Dict[int, int], max_connections: float) -> float:
+    """
+    Сумма частичных энтропий по гистограмме {число связей: число вершин}.
+    """
+    return math.fsum(k * partial_entropy(count, max_connections) for count, k in histogram.items())
+
+
+def bernstein_radius(variance: float, value_range: float, n: int, delta: float) -> float:
+    """
+    Эмпирическая граница Бернштейна (Audibert, Munos, Szepesvári, 2009): для n независимых
+    значений из [0, value_range] с выборочной (смещённой) дисперсией variance среднее
+    отличается от матожидания не больше чем на возвращаемую величину с вероятностью 1 - delta.
+    """
+    log_term = math.log(3 / delta)
+    return math.sqrt(2 * variance * log_term / n) + 3 * value_range * log_term / n
+
+
+def read_parents(lines: Iterable[str], root: str) -> Tuple[array, int]:
+    """
+    Один проход по рёбрам "a,b" без таблицы идентификаторов и CSR: хранятся только словарь
+    id -> номер и массивы родителей и системы непересекающихся множеств.
+
+    Рёбра приходят в любом порядке и направлении, поэтому поддерживается лес подвешенных
+    деревьев: ребро между двумя деревьями подвешивает меньшее (по размеру множества) к концу
+    ребра в большем, предварительно переподвесив его за свой конец — разворотом указателей
+    на пути к его корню. Вершина попадает в меньшее дерево не больше log2(N) раз, так что
+    проход занимает O(N log N) шагов. В конце лес переподвешивается за root.
+
+    Возвращает (parents, номер root); parents[v] — родитель v (-1 у корня). Если рёбра
+    не образуют дерево, содержащее root, возбуждается ValueError.
+    """
+    index: Dict[str, int] = {}
+    parents = array('i')
+    sets = array('i')
+    sizes = array('i')
+
+    def node(k: str) -> int:
+        i = index.get(k)
+        if i is None:
+            i = index[k] = len(parents)
+            parents.append(-1)
+            sets.append(i)
+            sizes.append(1)
+        return i
+
+    def find(v: int) -> int:
+        while sets[v] != v:
+            sets[v] = sets[sets[v]]
+            v = sets[v]
+        return v
+
+    def evert(v: int):
+        previous = -1
+        while v != -1:
+            following = parents[v]
+            parents[v] = previous
+            previous, v = v, following
+
+    edges = 0
+    for line in lines:
+        edge = line.rstrip('\n').split(',')
+        a, b = node(edge[0]), node(edge[1])
+        set_a, set_b = find(a), find(b)
+        if set_a == set_b:
+            raise ValueError(f'вход не является деревом с корнем {root}: цикл через {edge[0]}, {edge[1]}')
+        if sizes[set_a] < sizes[set_b]:
+            a, b, set_a, set_b = b, a, set_b, set_a
+        evert(b)
+        parents[b] = a
+        sets[set_b] = set_a
+        sizes[set_a] += sizes[set_b]
+        edges += 1
+
+    # без циклов N - 1 ребро связывают все N вершин
+    if root not in index or edges != len(parents) - 1:
+        raise ValueError(f'вход не является деревом с корнем {root}')
+    r = index[root]
+    evert(r)
+    return parents, r
+
+
+def approximate_entropy(
+    s: Union[str, Iterable[str]],
+    e: str,
+    error: float = 0.01,
+    confidence: float = 0.95,
+    seed: int = None
+) -> Tuple[float, float, Dict[str, float]]:
+    """
+    Оценка entropy_sum и h с относительной погрешностью error: |оценка - точное| <= error * точное
+    с вероятностью не меньше confidence.
+
+    Режим для больших иерархий: s — строка рёбер или любой итерируемый источник строк "a,b"
+    (например, открытый файл), который читается одним проходом (read_parents). В памяти
+    остаются только словарь идентификаторов и несколько массивов по N чисел — без списка
+    строк, таблицы ids, CSR и матриц, которые строит graph.
+
+    Слагаемые r1, r2 и r5 (дети, руководитель, коллеги) зависят только от числа детей вершины
+    и её родителя, поэтому считаются точно по гистограмме чисел детей. Слагаемые r3 и r4
+    (потомки и глубина) оцениваются по случайной выборке вершин:
+      - глубина — точно, подъёмом по родителям;
+      - число потомков — точно у листьев (0), у остальных скетчем: подъём к корню из
+        случайной вершины проходит через v с вероятностью (потомки v) / N.
+    Погрешность выборки — эмпирическая граница Бернштейна для среднего r3 + r4, погрешность
+    скетча — та же граница для доли подъёмов через каждую вершину; подъёмы добавляются, пока
+    погрешность скетча больше половины допустимой. Выборка удваивается, пока сумма границ
+    не станет меньше error от нижней оценки entropy_sum. Если видно, что на это уйдёт больше
+    шагов, чем на точный проход по массиву родителей (обычно у разветвлённых деревьев: почти
+    все вершины дают вклад порядка 1/N, а редкие верхние — порядка 1), считается точное
+    значение — тоже за O(N) по тем же массивам.
+
+    Возвращает (entropy_sum, h, точность) без округления; точность — словарь:
+      method            — 'sample' или 'exact'
+      samples, walks    — число вершин в выборке и подъёмов скетча
+      sampling_error    — граница погрешности entropy_sum из-за выборки
+      sketch_error      — граница погрешности entropy_sum из-за скетча числа потомков
+      entropy_sum_error — их сумма
+      relative_error    — entropy_sum_error относительно нижней оценки entropy_sum
+                          (та же относительная погрешность у h)
+      h_error           — entropy_sum_error в единицах h
+      confidence        — уровень доверия
+    Если вход — не дерево с корнем e, возбуждается ValueError.
+    """
+    # импортируется по требованию, чтобы не замедлять импорт модуля
+    import random
+
+    parents, root = read_parents(io.StringIO(s) if isinstance(s, str) else s, e)
+    N = len(parents)
+    h_ref = N * 5 * 0.5307
+    max_connections = float(N - 1)
+
+    def f(count: float) -> float:
+        return partial_entropy(count, max_connections)
+
+    children = array('i', [0]) * N
+    for parent in parents:
+        if parent != -1:
+            children[parent] += 1
+
+    # r1, r2 и r5 точно: у родителя с c детьми каждый из них имеет c - 1 коллег
+    histogram = Counter(children)
+    known = (
+        histogram_entropy(histogram, max_connections)
+        + (N - 1) * f(1)
+        + math.fsum(k * count * f(count - 1) for count, k in histogram.items() if count)
+    )
+
+    def report(method: str, entropy_sum: float, sampling_error: float, sketch_error: float,
+               lower: float) -> Tuple[float, float, Dict[str, float]]:
+        total = sampling_error + sketch_error
+        return entropy_sum, entropy_sum / h_ref, {
+            'method': method, 'samples': len(points), 'walks': walks,
+            'sampling_error': sampling_error, 'sketch_error': sketch_error,
+            'entropy_sum_error': total, 'relative_error': total / lower if lower else 0.0,
+            'h_error': total / h_ref, 'confidence': confidence
+        }
+
+    rnd = random.Random(seed)
+    # вероятность ошибки поровну между выборкой и скетчем; на проверке номер k —
+    # delta / 2^k, чтобы повторные проверки не ухудшали уровень доверия
+    delta = (1 - confidence) / 2
+    # r3 + r4 у одной вершины лежат в [0, 2 / (e * ln2)]
+    value_range = 2 / (math.e * math.log(2))
+    # шагов обхода: примерно столько же стоит точный проход
+    budget = N
+    work = walk_work = 0
+
+    points: List[Tuple[int, int, int, int]] = []  # (вершина, глубина, границы числа потомков)
+    sketch: Dict[int, List[int]] = {}  # вершина -> [подъёмов через неё, номер подъёма при добавлении]
+    walks = 0
+    checks = 0
+    samples = 256
+    stage = 0
+    while samples < N and work + walk_work < budget:
+        stage += 1
+        while len(points) < samples:
+            v = rnd.randrange(N)
+            depth = 0
+            u = parents[v]
+            while u != -1:
+                depth += 1
+                u = parents[u]
+            work += depth + 1
+            if children[v]:
+                sketch.setdefault(v, [0, walks])
+                points.append((v, depth, children[v], N - 1 - depth))
+            else:
+                points.append((v, depth, 0, 0))
+
+        while True:
+            checks += 1
+            check_delta = delta / 2 ** checks
+            values: List[float] = []
+            deviations: List[float] = []
+            for v, depth, low, high in points:
+                term = f(max(depth - 1, 0))
+                if low == high:
+                    values.append(term + f(low - children[v]))
+                    deviations.append(0.0)
+                    continue
+                # интервал для числа потомков по доле подъёмов через v
+                count, first = sketch[v]
+                n = walks - first
+                share = count / n if n else 0.0
+                radius = bernstein_radius(share * (1 - share), 1.0, n, check_delta / len(sketch)) if n else 1.0
+                a = max(low, N * (share - radius)) - children[v]
+                b = min(high, N * (share + radius)) - children[v]
+                point = min(max(N * share - children[v], a), b)
+                peak = f(min(max(max_connections / math.e, a), b))
+                values.append(term + f(point))
+                deviations.append(max(peak - f(point), f(point) - min(f(a), f(b))))
+
+            mean = math.fsum(values) / samples
+            spread = math.sqrt(math.fsum((x - mean) ** 2 for x in values) / samples) \
+                + math.sqrt(math.fsum(d * d for d in deviations) / samples)
+            sampling_error = N * bernstein_radius(spread ** 2, value_range, samples, delta / 2 ** stage)
+            sketch_error = N * math.fsum(deviations) / samples
+            estimate = known + N * mean
+            lower = max(known, estimate - sampling_error - sketch_error)
+            target = error * lower
+            if not sketch or sketch_error <= target / 2 or work + walk_work >= budget:
+                break
+            # удваиваем число подъёмов
+            for _ in range(max(walks, samples)):
+                u = parents[rnd.randrange(N)]
+                while u != -1:
+                    walk_work += 1
+                    if u in sketch:
+                        sketch[u][0] += 1
+                    u = parents[u]
+            walks += max(walks, samples)
+
+        if sampling_error + sketch_error <= target:
+            return report('sample', estimate, sampling_error, sketch_error, lower)
+        # граница убывает не быстрее 1 / samples: столько вершин понадобится как минимум
+        needed = samples * sampling_error / (target - sketch_error) if target > sketch_error else math.inf
+        if work + walk_work + (needed - samples) * work / samples > budget:
+            break
+        samples *= 2
+
+    # точно: глубины подъёмом с запоминанием, затем потомки снизу вверх по уровням
+    depths = array('i', [-1]) * N
+    depths[root] = 0
+    path: List[int] = []
+    for v in range(N):
+        while depths[v] < 0:
+            path.append(v)
+            v = parents[v]
+        depth = depths[v]
+        while path:
+            depth += 1
+            depths[path.pop()] = depth
+    levels = Counter(depths)
+    # сортировка подсчётом: сначала самые глубокие вершины
+    position = array('i', [0]) * (max(levels) + 1)
+    total = 0
+    for depth in range(len(position) - 1, -1, -1):
+        position[depth] = total
+        total += levels[depth]
+    order = array('i', [0]) * N
+    for v in range(N):
+        order[position[depths[v]]] = v
+        position[depths[v]] += 1
+    descendants = array('i', [0]) * N
+    for v in order:
+        if parents[v] != -1:
+            descendants[parents[v]] += descendants[v] + 1
+    entropy_sum = (
+        known
+        + histogram_entropy(Counter(map(operator.sub, descendants, children)), max_connections)
+        + math.fsum(k * f(depth - 1) for depth, k in levels.items() if depth)
+    )
+    return report('exact', entropy_sum, 0.0, 0.0, entropy_sum)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
-from typing import List, Tuple, Set, DefaultDict
+from typing import List, Tuple, Set, DefaultDict, Mapping, Sequence
 from collections import defaultdict
-import sys
+from functools import lru_cache
+from types import MappingProxyType
 import copy
 import json
 
@@ -78,20 +79,20 @@ DIRECT_MAP = '''[
     ["жарко", "слабо"]
 ]'''
 
-def get_membership(x: float, points: List[List[float]]) -> float:
+def get_membership(x: float, points: Sequence[Sequence[float]]) -> float:
     """
     Вычисляет степень принадлежности точки x к нечеткому множеству.
     Использует линейную интерполяцию между заданными точками.
 
     :param x: Входное значение
-    :param points: Опорные точки функции принадлежности
+    :param points: Опорные точки функции принадлежности (не изменяются)
     :return: Значение принадлежности от 0.0 до 1.0
     """
     if not points:
         return 0.0
 
     # Сортировка точек по оси X
-    points.sort(key=lambda p: p[0])
+    points = sorted(points, key=lambda p: p[0])
 
     # Проверка границ области определения
     if x < points[0][0] or x > points[-1][0]:
@@ -155,26 +156,56 @@ def get_trapezoid(level: float, points: List[List[float]]) -> List[List[float]]:
     return trapezoid_points
 
 
-def main(
+def freeze(value):
+    """
+    Неизменяемая копия разобранного JSON: списки -> кортежи, объекты -> MappingProxyType.
+    """
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    return value
+
+
+@lru_cache(maxsize=32)
+def parse_specs(
     temperature_mfs_json: str,
     heating_mfs_json: str,
-    rules_json: str,
-    temperature_value: float
-) -> float:
+    rules_json: str
+) -> Tuple[Tuple[Mapping, ...], Tuple[Mapping, ...], Tuple[Tuple[str, str], ...]]:
     """
-    Основная функция нечеткого вывода по Мамдани.
+    Разбирает JSON-описания контроллера один раз, чтобы переиспользовать их
+    при выводе для многих значений температуры. Результат кешируется по тексту
+    описаний, поэтому повторные вызовы main с теми же константами JSON не разбирают.
+    Кешированный результат общий для всех вызывающих, поэтому он неизменяемый
+    (см. freeze); infer и fuzzy_controller его не меняют.
 
     :param temperature_mfs_json: Функции принадлежности для температуры (вход)
     :param heating_mfs_json: Функции принадлежности для нагрева (выход)
     :param rules_json: Правила нечеткого вывода
-    :param temperature_value: Текущее значение температуры
-    :return: Оптимальное управляющее воздействие
+    :return: (входные термы, выходные термы, правила)
     """
-    # 1. Парсинг входных данных
     input_mfs = json.loads(temperature_mfs_json)["температура"]
     output_mfs = json.loads(heating_mfs_json)["температура"]
     rules = json.loads(rules_json)
+    return freeze(input_mfs), freeze(output_mfs), freeze(rules)
+
+
+def infer(
+    input_mfs: List[dict],
+    output_mfs: List[dict],
+    rules: List[List[str]],
+    temperature_value: float
+) -> float:
+    """
+    Нечеткий вывод по Мамдани для уже разобранных описаний (см. parse_specs).
 
+    :param input_mfs: Входные термы (температура)
+    :param output_mfs: Выходные термы (нагрев)
+    :param rules: Правила нечеткого вывода
+    :param temperature_value: Текущее значение температуры
+    :return: Оптимальное управляющее воздействие
+    """
     # 2. Фаззификация - вычисление степеней принадлежности
     input_degrees = {}
     for element in input_mfs:
@@ -214,6 +245,164 @@ def main(
     return left_max[0]
 
 
+def get_segment(x: float, points: List[List[float]]) -> int:
+    """
+    Номер отрезка функции принадлежности, которым воспользуется get_membership для x
+    (первый отрезок, содержащий x), или -1, если x вне области определения.
+
+    :param x: Входное значение
+    :param points: Опорные точки, отсортированные по оси X
+    :return: Индекс отрезка или -1
+    """
+    if not points or x < points[0][0] or x > points[-1][0]:
+        return -1
+    for i in range(len(points) - 1):
+        if points[i][0] <= x <= points[i+1][0]:
+            return i
+    return -1
+
+
+def get_left_max(points: List[List[float]]) -> List[float]:
+    """
+    Первый максимум набора точек: точка с наибольшей ординатой, а среди равных —
+    с наименьшей абсциссой (как в дефаззификации main).
+
+    :param points: Точки усеченной функции
+    :return: Точка [x, y] или пустой список, если точек нет
+    """
+    left_max = []
+    for point in points:
+        if not left_max:
+            left_max = copy.deepcopy(point)
+        elif (left_max[1] < point[1]) or ((left_max[1] == point[1]) and (left_max[0] > point[0])):
+            left_max[1] = point[1]
+            left_max[0] = point[0]
+    return left_max
+
+
+class fuzzy_controller:
+    """
+    Контроллер с состоянием для медленно меняющихся входов.
+
+    Между вызовами запоминается, на каком отрезке функции принадлежности находился каждый
+    входной терм, с какими уровнями активации строились усеченные выходные функции и их
+    первые максимумы. При новом значении пересчитываются только термы, у которых сменился
+    отрезок (или значение на наклонном отрезке), и только выходные функции, у которых
+    изменился уровень. Если ни один уровень не изменился, возвращается прошлый результат.
+
+    Результат совпадает с infer для тех же описаний.
+    """
+
+    def __init__(self, input_mfs: List[dict], output_mfs: List[dict], rules: List[List[str]]):
+        """
+        :param input_mfs: Входные термы (температура)
+        :param output_mfs: Выходные термы (нагрев)
+        :param rules: Правила нечеткого вывода
+        """
+        # Входные термы: (id, отсортированные точки); при повторе id действует последний
+        self.inputs = [(element["id"], sorted(element["points"], key=lambda p: p[0])) for element in input_mfs]
+        self.segments = [None] * len(self.inputs)
+        self.degrees = [0.0] * len(self.inputs)
+        self.input_degrees: dict = {}
+
+        # Для каждого выходного терма — входные термы его правил (в порядке правил)
+        self.sources: DefaultDict[str, List[str]] = defaultdict(list)
+        for input_term, output_term_raw in rules:
+            output_term = (output_term_raw[:-1] + "ый") if output_term_raw[-1] == "о" else output_term_raw
+            self.sources[output_term].append(input_term)
+        self.output_levels: dict = {}
+
+        # Выходные термы в порядке первого появления id (как ключи activations в infer)
+        self.outputs = {}
+        for element in output_mfs:
+            self.outputs[element["id"]] = element["points"]
+        self.levels = {term_id: None for term_id in self.outputs}
+        self.maxima = {term_id: [] for term_id in self.outputs}
+        self.result = None
+
+    def update_input(self, i: int, x: float) -> bool:
+        """
+        Обновляет степень принадлежности i-го входного терма; True, если она изменилась.
+        """
+        points = self.inputs[i][1]
+        segment = self.segments[i]
+        if segment is not None:
+            if segment == -1:
+                still = not points or x < points[0][0] or x > points[-1][0]
+            else:
+                x1, y1 = points[segment]
+                x2, y2 = points[segment + 1]
+                still = (x1 < x <= x2) or (segment == 0 and x == x1)
+                # на горизонтальном или вертикальном отрезке значение от x не зависит
+                still = still and (y1 == y2 or x1 == x2)
+            if still:
+                return False
+
+        degree = get_membership(x, points)
+        changed = segment is None or degree != self.degrees[i]
+        self.segments[i] = get_segment(x, points)
+        self.degrees[i] = degree
+        return changed
+
+    def __call__(self, temperature_value: float) -> float:
+        """
+        :param temperature_value: Текущее значение температуры
+        :return: Оптимальное управляющее воздействие
+        """
+        first = self.result is None
+
+        # 1. Фаззификация только для сдвинувшихся термов
+        changed_terms = {self.inputs[i][0] for i in range(len(self.inputs))
+                         if self.update_input(i, temperature_value)}
+        if not changed_terms and not first:
+            return self.result
+        for (term, _), degree in zip(self.inputs, self.degrees):
+            self.input_degrees[term] = degree
+
+        # 2. Уровни активации только для выходных термов, зависящих от изменившихся входов
+        for output_term, input_terms in self.sources.items():
+            if first or changed_terms.intersection(input_terms):
+                level = 0.0
+                for input_term in input_terms:
+                    level = max(level, self.input_degrees.get(input_term, 0.0))
+                self.output_levels[output_term] = level
+
+        # 3. Усечение выходных функций с изменившимся уровнем
+        changed_levels = False
+        for term_id, points in self.outputs.items():
+            level = self.output_levels.get(term_id, 0.0)
+            if self.levels[term_id] is None or self.levels[term_id] != level:
+                self.levels[term_id] = level
+                self.maxima[term_id] = get_left_max(get_trapezoid(level, points))
+                changed_levels = True
+        if not changed_levels and not first:
+            return self.result
+
+        # 4. Первый максимум среди первых максимумов термов
+        self.result = get_left_max([point for point in self.maxima.values() if point])[0]
+        return self.result
+
+
+def main(
+    temperature_mfs_json: str,
+    heating_mfs_json: str,
+    rules_json: str,
+    temperature_value: float
+) -> float:
+    """
+    Основная функция нечеткого вывода по Мамдани.
+
+    :param temperature_mfs_json: Функции принадлежности для температуры (вход)
+    :param heating_mfs_json: Функции принадлежности для нагрева (выход)
+    :param rules_json: Правила нечеткого вывода
+    :param temperature_value: Текущее значение температуры
+    :return: Оптимальное управляющее воздействие
+    """
+    # 1. Парсинг входных данных
+    input_mfs, output_mfs, rules = parse_specs(temperature_mfs_json, heating_mfs_json, rules_json)
+    return infer(input_mfs, output_mfs, rules, temperature_value)
+
+
 if __name__ == "__main__":
     # Пример использования с температурой 19 градусов
     print(main(T_FUNC, TERM_FUNC, DIRECT_MAP, 19))
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+Построение матриц отношений task1 вне оперативной памяти (out-of-core).
+
+Каждая матрица N x N хранится в файле формата relation_format (одна матрица в кодировке
+PACKED: ceil(N / 8) байт на строку) и заполняется через mmap блоками строк (тайлами).
+Размер тайла выбирается так, чтобы строки, одновременно находящиеся в памяти, укладывались
+в бюджет tile_budget байт; всё остальное лежит в файле, и подкачкой страниц управляет ОС.
+
+  R1 — по спискам детей компактного графа task1;
+  R3 — обходом от детей каждой вершины (отмеченные биты строки служат множеством
+       посещённых, поэтому циклы обрабатываются как в замыкании);
+  R2, R4 — тайловым транспонированием R1, R3;
+  R5 — тайловым умножением R2 * R1 с обнулением диагонали.
+
+Готовые файлы читаются без копирования через relation_format.load(path)[0].
+
+Пример:
+  paths = tiled.relations(s, e, '/data/org', tile_budget=256 * 1024 * 1024)
+"""
+from typing import Iterable, Iterator, List, Tuple
+import mmap
+import os
+import re
+
+from loader import load_task
+import relation_format
+
+DEFAULT_TILE_BUDGET = 64 * 1024 * 1024
+
+# оценка накладных расходов на одно целое-строку Python сверх её W байт
+ROW_OVERHEAD = 64
+
+# номера установленных битов каждого значения байта
+BIT_POSITIONS = tuple(tuple(j for j in range(8) if value >> j & 1) for value in range(256))
+NONZERO = re.compile(b'[^\\x00]')
+
+NAMES = ('direct_management', 'direct_subordination', 'transitive_management',
+         'transitive_subordination', 'single_level_subordination')
+
+
+class tiled_matrix:
+    """
+    Упакованная булева матрица N x N в отображённом в память файле.
+    Строка i — целое число, бит j которого равен M[i][j].
+    """
+
+    def __init__(self, path: str, N: int = None):
+        """
+        С N — создаёт новый файл из нулей, без N — открывает существующий.
+        """
+        self.path = path
+        if N is not None:
+            self.N = N
+            self.W = (N + 7) // 8
+            self.offset = relation_format.HEADER.size + relation_format.ENTRY.size
+            self.offset += -self.offset % 8
+            with open(path, 'wb') as file:
+                file.write(relation_format.HEADER.pack(relation_format.MAGIC, relation_format.VERSION, 1, N))
+                file.write(relation_format.ENTRY.pack(relation_format.PACKED, self.offset, N * self.W))
+                file.truncate(self.offset + N * self.W)
+        else:
+            with open(path, 'rb') as file:
+                header = file.read(relation_format.HEADER.size + relation_format.ENTRY.size)
+            _, _, _, self.N = relation_format.HEADER.unpack_from(header)
+            encoding, self.offset, _ = relation_format.ENTRY.unpack_from(header, relation_format.HEADER.size)
+            if encoding != relation_format.PACKED:
+                raise ValueError(f'{path}: ожидается кодировка PACKED')
+            self.W = (self.N + 7) // 8
+
+        self.file = open(path, 'r+b')
+        # mmap нулевой длины невозможен, пустую матрицу не отображаем
+        self.map = mmap.mmap(self.file.fileno(), 0) if self.N else None
+
+    def row(self, i: int) -> int:
+        start = self.offset + i * self.W
+        return int.from_bytes(self.map[start:start + self.W], 'little')
+
+    def read_rows(self, start: int, stop: int) -> List[int]:
+        return [self.row(i) for i in range(start, stop)]
+
+    def row_bytes(self, i: int, first: int, last: int) -> bytes:
+        """
+        Байты first..last-1 строки i, т.е. столбцы [8 * first, 8 * last) без чтения всей строки.
+        """
+        start = self.offset + i * self.W
+        return self.map[start + first:start + last]
+
+    def write_rows(self, start: int, rows: List[int]):
+        self.write_row_bytes(start, (row.to_bytes(self.W, 'little') for row in rows))
+
+    def write_row_bytes(self, start: int, rows: Iterable[bytes]):
+        position = self.offset + start * self.W
+        for row in rows:
+            self.map[position:position + self.W] = row
+            position += self.W
+
+    def close(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def tile_rows(N: int, tile_budget: int, tiles_in_memory: int = 1) -> int:
+    """
+    Число строк в тайле, чтобы tiles_in_memory тайлов укладывались в tile_budget байт.
+    """
+    W = (N + 7) // 8
+    return max(1, tile_budget // (tiles_in_memory * (W + ROW_OVERHEAD)))
+
+
+def tiles(N: int, rows: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, N, rows):
+        yield start, min(start + rows, N)
+
+
+def tiled_transpose(source: tiled_matrix, target: tiled_matrix, tile_budget: int = DEFAULT_TILE_BUDGET):
+    """
+    target = source^T. Тайл строк target [start, stop) — это столбцы [start, stop) source:
+    из каждой строки source читаются только покрывающие их байты, поэтому весь результат
+    получается за одно прочтение source при любом размере тайла. Ненулевые байты ищутся
+    регулярным выражением (в C), биты ставятся на место в bytearray строк тайла;
+    в памяти — только этот тайл.
+    """
+    N, W = source.N, source.W
+    rows = tile_rows(N, tile_budget)
+    for start, stop in tiles(N, rows):
+        first, last = start >> 3, (stop + 7) >> 3
+        empty = bytes(last - first)
+        out = [bytearray(W) for _ in range(stop - start)]
+        for i in range(N):
+            chunk = source.row_bytes(i, first, last)
+            if chunk == empty:
+                continue
+            byte, bit = i >> 3, 1 << (i & 7)
+            for match in NONZERO.finditer(chunk):
+                base = ((first + match.start()) << 3) - start
+                for position in BIT_POSITIONS[chunk[match.start()]]:
+                    if 0 <= base + position < stop - start:
+                        out[base + position][byte] |= bit
+        target.write_row_bytes(start, out)
+
+
+def tiled_multiplication(A: tiled_matrix, B: tiled_matrix, target: tiled_matrix,
+                         tile_budget: int = DEFAULT_TILE_BUDGET):
+    """
+    target = A * B (булево). Строка результата — OR строк B, выбранных битами строки A;
+    строки B читаются из файла по мере надобности, в памяти — тайл A и тайл результата.
+    """
+    multiply_packed_row = load_task('task1').multiply_packed_row
+
+    class rows_of:
+        def __getitem__(self, k: int) -> int:
+            return B.row(k)
+
+    rows = tile_rows(A.N, tile_budget, 2)
+    for start, stop in tiles(A.N, rows):
+        target.write_rows(start, [multiply_packed_row(row, rows_of()) for row in A.read_rows(start, stop)])
+
+
+def relations(s: str, e: str, directory: str, tile_budget: int = DEFAULT_TILE_BUDGET) -> Tuple[str, ...]:
+    """
+    Строит R1..R5 (как task1.main) в файлах каталога directory.
+
+    :return: пути к файлам матриц в порядке R1..R5
+    """
+    g = load_task('task1').graph(s, e)
+    N = len(g.ids)
+    W = (N + 7) // 8
+    rows = tile_rows(N, tile_budget)
+    os.makedirs(directory, exist_ok=True)
+    paths = tuple(os.path.join(directory, f'{name}.bin') for name in NAMES)
+    r1, r2, r3, r4, r5 = (tiled_matrix(path, N) for path in paths)
+    try:
+        for start, stop in tiles(N, rows):
+            r1.write_rows(start, [sum(1 << j for j in g.get_children(i)) for i in range(start, stop)])
+
+            tile = []
+            for i in range(start, stop):
+                reached = bytearray(W)
+                stack = list(g.get_children(i))
+                while stack:
+                    v = stack.pop()
+                    if not reached[v >> 3] & (1 << (v & 7)):
+                        reached[v >> 3] |= 1 << (v & 7)
+                        stack.extend(g.get_children(v))
+                tile.append(int.from_bytes(reached, 'little'))
+            r3.write_rows(start, tile)
+
+        tiled_transpose(r1, r2, tile_budget)
+        tiled_transpose(r3, r4, tile_budget)
+        tiled_multiplication(r2, r1, r5, tile_budget)
+
+        for start, stop in tiles(N, rows):
+            r5.write_rows(start, [row & ~(1 << i) for i, row in enumerate(r5.read_rows(start, stop), start)])
+    finally:
+        for matrix in (r1, r2, r3, r4, r5):
+            matrix.close()
+    return paths